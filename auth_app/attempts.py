@@ -0,0 +1,124 @@
+import time
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+from helper.exceptions import SmoothException
+from helper.shared_store import shared_store
+
+shared_store.register_schema("""
+    CREATE TABLE IF NOT EXISTS login_attempts (
+        key TEXT PRIMARY KEY,
+        failures INTEGER NOT NULL,
+        window_start REAL NOT NULL,
+        locked_until REAL NOT NULL
+    ) WITHOUT ROWID;
+""")
+
+
+DEFAULT_POLICIES = {
+    "login": {"EMAIL_MAX_FAILURES": 5, "IP_MAX_FAILURES": 50, "WINDOW": 900, "LOCKOUT": 900},
+    "password_reset": {"EMAIL_MAX_FAILURES": 3, "IP_MAX_FAILURES": 20, "WINDOW": 3600, "LOCKOUT": 3600},
+}
+
+
+class LoginAttemptTracker:
+    """
+    Per-email and per-IP attempt counters kept in the host-wide shared store.
+
+    `check` runs before any user lookup or password hashing, so requests for a
+    locked email or IP are rejected without touching the database.
+    Policies (max failures, counting window, lockout length) come from settings.LOGIN_LOCKOUT.
+    """
+
+    def __init__(self, scope):
+        self.scope = scope
+        policy = {**DEFAULT_POLICIES.get(scope, {}), **getattr(settings, "LOGIN_LOCKOUT", {}).get(scope, {})}
+        self.limits = {"email": policy["EMAIL_MAX_FAILURES"], "ip": policy["IP_MAX_FAILURES"]}
+        self.window = policy["WINDOW"]
+        self.lockout = policy["LOCKOUT"]
+
+    def _keys(self, email=None, ip=None):
+        keys = {}
+        if email:
+            keys["email"] = f"{self.scope}:email:{email.strip().lower()}"
+        if ip:
+            keys["ip"] = f"{self.scope}:ip:{ip}"
+        return keys
+
+    @staticmethod
+    def get_client_ip(request):
+        """
+        Address the per-IP counters are keyed on. X-Forwarded-For is client supplied, so it is only
+        read (through DRF's parsing) when REST_FRAMEWORK['NUM_PROXIES'] declares trusted proxies.
+        """
+        if request is None:
+            return None
+        if api_settings.NUM_PROXIES:
+            return BaseThrottle().get_ident(request)
+        return request.META.get("REMOTE_ADDR")
+
+    def check(self, email=None, ip=None):
+        keys = self._keys(email, ip)
+        if not keys:
+            return
+
+        placeholders = ", ".join("?" * len(keys))
+        now = time.time()
+        row = shared_store.connection().execute(
+            f"SELECT MAX(locked_until) FROM login_attempts WHERE key IN ({placeholders}) AND locked_until > ?",
+            (*keys.values(), now),
+        ).fetchone()
+
+        if row and row[0]:
+            retry_after = int(row[0] - now) + 1
+            raise SmoothException(
+                detail=f"Too many attempts. Try again in {retry_after} seconds.",
+                dev_message=f"{self.scope} locked for {', '.join(keys.values())} until {row[0]}",
+                type="warning",
+                status_code=429,
+            )
+
+    def register_failure(self, email=None, ip=None):
+        now = time.time()
+        with shared_store.transaction() as connection:
+            for kind, key in self._keys(email, ip).items():
+                row = connection.execute(
+                    "SELECT failures, window_start FROM login_attempts WHERE key = ?", (key,)
+                ).fetchone()
+                failures, window_start = (row[0] + 1, row[1]) if row and now - row[1] < self.window else (1, now)
+                locked_until = now + self.lockout if failures >= self.limits[kind] else 0
+                connection.execute(
+                    "INSERT INTO login_attempts (key, failures, window_start, locked_until) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET failures = excluded.failures, "
+                    "window_start = excluded.window_start, locked_until = excluded.locked_until",
+                    (key, failures, window_start, locked_until),
+                )
+
+    def register_success(self, email=None):
+        keys = self._keys(email=email)
+        if keys:
+            shared_store.connection().execute("DELETE FROM login_attempts WHERE key = ?", (keys["email"],))
+
+    @staticmethod
+    def list_locks():
+        rows = shared_store.connection().execute(
+            "SELECT key, failures, window_start, locked_until FROM login_attempts "
+            "WHERE locked_until > ? ORDER BY locked_until DESC",
+            (time.time(),),
+        ).fetchall()
+        return [
+            {"key": key, "failures": failures, "window_start": window_start, "locked_until": locked_until}
+            for key, failures, window_start, locked_until in rows
+        ]
+
+    @staticmethod
+    def clear(key=None):
+        """Clears one counter by key, or every counter when no key is given. Returns the rows removed."""
+        connection = shared_store.connection()
+        if key:
+            return connection.execute("DELETE FROM login_attempts WHERE key = ?", (key,)).rowcount
+        return connection.execute("DELETE FROM login_attempts").rowcount
+
+
+login_attempts = LoginAttemptTracker("login")
+password_reset_attempts = LoginAttemptTracker("password_reset")
@@ -1,11 +1,25 @@
 import os
 import jwt
+import copy
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.utils.functional import LazyObject
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 import helper
+from helper.cache import TTLCache
+from helper.revocation import revocation_list
+from helper.signing import key_ring
+
+
+def stateless_auth_enabled():
+    return getattr(settings, 'STATELESS_AUTH', {}).get('ENABLED', False)
+
+
+principal_cache = TTLCache(
+    max_entries=10000,
+    ttl=getattr(settings, 'STATELESS_AUTH', {}).get('PRINCIPAL_CACHE_TTL', 30),
+)
 
 
 class LazyUserModel(LazyObject):
@@ -24,13 +38,16 @@ class JWTSessionAuthentication(BaseAuthentication):
         if not auth_header:
             raise AuthenticationFailed('Authorization header is required for authentication.')
 
+        return self.authenticate_header_value(request, auth_header)
+
+    def authenticate_header_value(self, request, auth_header):
         try:
             token = auth_header.split()[1]
         except IndexError:
             raise AuthenticationFailed('Invalid token header. No token provided.')
 
         try:
-            decoded_payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+            decoded_payload = key_ring.decode(token)
             session_key = decoded_payload.get('session_key')
             if not session_key:
                 raise AuthenticationFailed('Invalid token payload.')
@@ -39,22 +56,39 @@ class JWTSessionAuthentication(BaseAuthentication):
         except jwt.InvalidTokenError:
             raise AuthenticationFailed('Invalid token.')
 
-        session_data = helper.utils.retrieve_session(session_key)
-        if not session_data:
-            raise AuthenticationFailed('Invalid session.')
+        if stateless_auth_enabled() and decoded_payload.get('user_id'):
+            if revocation_list.is_revoked(decoded_payload):
+                raise AuthenticationFailed('Token has been revoked.')
+            user = self.get_cached_principal(decoded_payload['user_id'])
+        else:
+            session_data = helper.utils.retrieve_session(session_key)
+            if not session_data or session_data.get('purpose') == 'password_reset':
+                raise AuthenticationFailed('Invalid session.')
+
+            user = self.get_principal(session_data.get('user_id'))
 
-        user_id = session_data.get('user_id')
+        request.decoded_payload = decoded_payload
+        return (user, decoded_payload)
 
+    def get_principal(self, user_id):
+        """Loads the user together with its role in a single query."""
         try:
-            user = User.objects.get(id=user_id)
+            user = User.objects.get_principal(user_id)
         except User.DoesNotExist:
             raise AuthenticationFailed('User not found.')
         
         if not user.is_active:
             raise AuthenticationFailed('User is inactive.')
-        
-        request.decoded_payload = decoded_payload
-        return (user, decoded_payload)
+
+        return user
+
+    def get_cached_principal(self, user_id):
+        """Stateless path: serves the principal from the per-process cache when possible."""
+        user = principal_cache.get(user_id)
+        if user is None:
+            user = self.get_principal(user_id)
+            principal_cache.set(user_id, user)
+        return copy.deepcopy(user)
 
     def authenticate_header(self, request):
         """
@@ -79,7 +113,7 @@ class ServiceAuthentication(BaseAuthentication):
         request.internal_service = self
         return (None, None)
 
-class JWTOrServiceAuthentication(BaseAuthentication):
+class JWTOrServiceAuthentication(JWTSessionAuthentication):
     """
     Custom authentication class that first checks for X-Service-Auth.
     If not present, it falls back to JWT token authentication.
@@ -92,7 +126,7 @@ class JWTOrServiceAuthentication(BaseAuthentication):
 
         if service_token:
             if service_token == internal_secret_key:
-                request.internal_service = JWTOrServiceAuthentication
+                request.internal_service = self
                 return (None, None)  # Service is authenticated, no user needed
             else:
                 raise AuthenticationFailed('Invalid service authentication token.')
@@ -102,55 +136,4 @@ class JWTOrServiceAuthentication(BaseAuthentication):
         if not auth_header:
             return None
 
-        try:
-            token = auth_header.split()[1]
-        except IndexError:
-            raise AuthenticationFailed('Invalid token header. No token provided.')
-
-        try:
-            decoded_payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-            session_key = decoded_payload.get('session_key')
-            if not session_key:
-                raise AuthenticationFailed('Invalid token payload.')
-        except jwt.ExpiredSignatureError:
-            raise AuthenticationFailed('Token has expired.')
-        except jwt.InvalidTokenError:
-            raise AuthenticationFailed('Invalid token.')
-
-        session_data = helper.utils.retrieve_session(session_key)
-        if not session_data:
-            raise AuthenticationFailed('Invalid session.')
-
-        user_id = session_data.get('user_id')
-
-        try:
-            user = User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            raise AuthenticationFailed('User not found.')
-        
-        if not user.is_active:
-            raise AuthenticationFailed('User is inactive.')
-        
-        request.decoded_payload = decoded_payload
-        return (user, decoded_payload)
-
-    def authenticate_header(self, request):
-        return 'Bearer'
-
-    """
-    Custom authentication class to validate requests from internal services 
-    (e.g., admin service) using a shared token.
-    """
-
-    def authenticate(self, request):
-        service_token = request.headers.get('X-Service-Auth')
-        INTERNAL_SECRET_KEY = os.environ.get('INTERNAL_SECRET_KEY')
-        
-        if not service_token:
-            raise AuthenticationFailed('Missing service authentication token.')
-
-        if service_token != INTERNAL_SECRET_KEY:
-            raise AuthenticationFailed('Invalid service authentication token.')
-
-        request.internal_service = self
-        return (None, None)
\ No newline at end of file
+        return self.authenticate_header_value(request, auth_header)
@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('introspect', views.TokenIntrospectionView.as_view(), name='token-introspect'),
+]
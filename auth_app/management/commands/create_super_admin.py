@@ -30,21 +30,12 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.WARNING("Creating Super Admin role..."))
 
-        # 4️⃣ Create role with just **one permission object**
+        # 4️⃣ Create role with just the **system.all** permission slug
         super_admin_role, role_created = Role.objects.get_or_create(
             name="Super Admin",
             defaults={
                 "description": "System role with all permissions",
-                "permissions": [
-                      {
-                        "slug": "system.all",
-                        "name": "System Role - All Permissions",
-                        "description": "This role has all permissions and can perform any action in the system.",
-                        "category": "system",
-                        "request_method": "*"
-                    },
-
-                ],
+                "permissions": ["system.all"],
                 "is_system": True,
                 "is_super_admin": True,
                 "created_at": timezone.now(),
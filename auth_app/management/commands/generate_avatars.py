@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from auth_app.models import User
+
+
+class Command(BaseCommand):
+    help = 'Generates the default profile picture of users that have none (e.g. after a bulk import)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Users loaded and updated per batch')
+
+    def handle(self, *args, **options):
+        pending = User.objects.filter(Q(profile_picture='') | Q(profile_picture__isnull=True)).order_by('id').only('id', 'email', 'profile_picture')
+        generated, last_id = 0, None
+
+        while True:
+            batch = pending.filter(id__gt=last_id) if last_id else pending
+            users = list(batch[:options['batch_size']])
+            if not users:
+                break
+
+            for user in users:
+                user.generate_default_profile_picture()
+            User.objects.bulk_update(users, ['profile_picture'])
+
+            generated += len(users)
+            last_id = users[-1].id
+            self.stdout.write(f"\rGenerated {generated} avatars...", ending='')
+
+        self.stdout.write("\n")
+        self.stdout.write(self.style.SUCCESS(f"✅ Generated {generated} default profile pictures."))
@@ -0,0 +1,49 @@
+import os
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+
+class Command(BaseCommand):
+    help = 'Generates a JWT signing key pair in JWT_SIGNING["KEYS_DIR"] for rotation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algorithm', choices=['EdDSA', 'RS256'], default='EdDSA')
+        parser.add_argument('--kid', help='Key id [Default: current timestamp]')
+
+    def handle(self, *args, **options):
+        keys_dir = Path(settings.JWT_SIGNING['KEYS_DIR'])
+        kid = options['kid'] or timezone.now().strftime('%Y%m%d%H%M%S')
+        private_path = keys_dir / f'{kid}.private.pem'
+        public_path = keys_dir / f'{kid}.public.pem'
+
+        if private_path.exists() or public_path.exists():
+            raise CommandError(f"A key with id '{kid}' already exists in {keys_dir}.")
+
+        if options['algorithm'] == 'EdDSA':
+            private_key = ed25519.Ed25519PrivateKey.generate()
+        else:
+            private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+        keys_dir.mkdir(parents=True, exist_ok=True)
+        # Created owner-only from the start, so the key is never readable under the default umask.
+        try:
+            fd = os.open(private_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            raise CommandError(f"A key with id '{kid}' already exists in {keys_dir}.")
+        with os.fdopen(fd, 'wb') as private_file:
+            private_file.write(private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption(),
+            ))
+        public_path.write_bytes(private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        ))
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Generated {options['algorithm']} key '{kid}' in {keys_dir}"))
+        self.stdout.write("Set JWT_ACTIVE_KID to this id once every instance has the new public key.")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from auth_app.models import AuthSession, TokenRevocation
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired authentication sessions and token revocations in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per statement')
+
+    def handle(self, *args, **options):
+        removed = AuthSession.objects.purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ Purged {removed} expired sessions."))
+        removed = TokenRevocation.objects.purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ Purged {removed} expired token revocations."))
@@ -1,8 +1,15 @@
 import os
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
 from django.contrib.auth.models import BaseUserManager
-from django.db import transaction
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.crypto import get_random_string
 from helper.validators import valid_email
 from helper.exceptions import SmoothException
+from helper.hashing import set_user_password
+from helper.invalidation import invalidation_bus
 
 
 class UserManager(BaseUserManager):
@@ -28,7 +35,7 @@ class UserManager(BaseUserManager):
         # Using atomic transactions to ensure all operations succeed or roll back entirely.
         with transaction.atomic():
             user = self.model(email=email, **extra_fields)
-            user.set_password(password)
+            set_user_password(user, password)
             user.save(using=self._db)
             
         return user
@@ -43,4 +50,167 @@ class UserManager(BaseUserManager):
         return self.create_user(**extra_fields)
 
     def create_superuser(self, email, password=None, **extra_fields):
-        return self.create_user(email, password, **extra_fields)        
+        return self.create_user(email, password, **extra_fields)
+
+    def with_role(self):
+        """Users with the role and its parent ids eager-loaded, as nested by the user serializers."""
+        return self.select_related('role').prefetch_related('role__parents')
+
+    def get_principal(self, user_id):
+        """Fetches the user and its role with a single joined query."""
+        return self.select_related('role').get(id=user_id)        
+
+
+
+class RoleManager(models.Manager):
+    """Maintains Role.effective_permissions, the transitive closure of a role's own and inherited slugs."""
+
+    def descendant_ids(self, role_ids):
+        """Ids of every role that inherits, directly or not, from one of `role_ids`."""
+        edges = self.model.parents.through.objects
+        descendants, frontier = set(), set(role_ids)
+        while frontier:
+            children = set(edges.filter(to_role_id__in=frontier).values_list('from_role_id', flat=True))
+            frontier = children - descendants
+            descendants |= frontier
+        return descendants
+
+    def recompute_closure(self, role_ids):
+        """
+        Recomputes effective_permissions for `role_ids` and their descendants only, parents before
+        children, and saves the rows whose closure changed. Returns {role_id: effective_permissions}
+        for the changed roles.
+        """
+        from helper.permissions import permission_slugs
+
+        affected = set(role_ids) | self.descendant_ids(role_ids)
+        if not affected:
+            return {}
+
+        parents = defaultdict(set)
+        for child_id, parent_id in self.model.parents.through.objects.filter(
+            from_role_id__in=affected
+        ).values_list('from_role_id', 'to_role_id'):
+            parents[child_id].add(parent_id)
+
+        roles = self.only('id', 'permissions', 'effective_permissions').in_bulk(affected)
+        outside = {parent_id for ids in parents.values() for parent_id in ids} - affected
+        effective = {
+            role_id: set(slugs)
+            for role_id, slugs in self.filter(id__in=outside).values_list('id', 'effective_permissions')
+        }
+
+        # Kahn's algorithm over the affected subgraph; edges to roles outside it are already resolved.
+        pending = {role_id: len(parents[role_id] & affected) for role_id in roles}
+        children = defaultdict(list)
+        for child_id in roles:
+            for parent_id in parents[child_id] & affected:
+                children[parent_id].append(child_id)
+        ready = [role_id for role_id, count in pending.items() if count == 0]
+
+        changed = []
+        while ready:
+            role_id = ready.pop()
+            role = roles[role_id]
+            closure = set(permission_slugs(role.permissions))
+            for parent_id in parents[role_id]:
+                closure |= effective.get(parent_id, set())
+            effective[role_id] = closure
+
+            closure = sorted(closure)
+            if closure != role.effective_permissions:
+                role.effective_permissions = closure
+                changed.append(role)
+
+            for child_id in children[role_id]:
+                pending[child_id] -= 1
+                if pending[child_id] == 0:
+                    ready.append(child_id)
+
+        if changed:
+            now = timezone.now()
+            for role in changed:
+                role.updated_at = now
+            self.bulk_update(changed, ['effective_permissions', 'updated_at'])
+            # bulk_update skips post_save, so workers are told directly.
+            for role in changed:
+                transaction.on_commit(lambda role_id=role.id: invalidation_bus.publish('role', role_id))
+
+        return {role.id: role.effective_permissions for role in changed}
+
+
+class AuthSessionManager(models.Manager):
+    """Storage engine for AuthSession rows used by helper.utils session functions."""
+
+    key_chars = "abcdefghijklmnopqrstuvwxyz0123456789"
+
+    def active(self):
+        return self.filter(expire_date__gt=timezone.now())
+
+    def for_user(self, user_id):
+        """Active login sessions of a user, excluding one-off password reset sessions."""
+        return self.active().filter(user_id=user_id).filter(
+            models.Q(data__purpose__isnull=True) | ~models.Q(data__purpose='password_reset')
+        )
+
+    def create_session(self, user_id, data=None, expiry_seconds=None):
+        if expiry_seconds is None:
+            expiry_seconds = settings.SESSION_COOKIE_AGE
+
+        return self.create(
+            session_key=get_random_string(32, self.key_chars),
+            user_id=user_id,
+            expire_date=timezone.now() + timedelta(seconds=expiry_seconds),
+            data=data or {},
+        )
+
+    def create_sessions(self, user_ids, data=None, expiry_seconds=None):
+        """One session per user with the same data, inserted with a single bulk_create."""
+        if expiry_seconds is None:
+            expiry_seconds = settings.SESSION_COOKIE_AGE
+
+        expire_date = timezone.now() + timedelta(seconds=expiry_seconds)
+        return self.bulk_create([
+            self.model(
+                session_key=get_random_string(32, self.key_chars),
+                user_id=user_id,
+                expire_date=expire_date,
+                data=data or {},
+            )
+            for user_id in user_ids
+        ], batch_size=500)
+
+    def revoke_for_user(self, user_id, keep_session=None):
+        """Deletes every session of a user through the user index and returns the revoked keys."""
+        sessions = self.filter(user_id=user_id)
+        if keep_session:
+            sessions = sessions.exclude(session_key=keep_session)
+
+        session_keys = list(sessions.values_list('session_key', flat=True))
+        if session_keys:
+            self.filter(session_key__in=session_keys).delete()
+        return session_keys
+
+    def purge_expired(self, batch_size=1000):
+        """Deletes expired sessions in batches through the expiry index, returns the total removed."""
+        removed = 0
+        while True:
+            session_keys = list(
+                self.filter(expire_date__lte=timezone.now()).values_list('session_key', flat=True)[:batch_size]
+            )
+            if not session_keys:
+                return removed
+            removed += self.filter(session_key__in=session_keys).delete()[0]
+
+
+class TokenRevocationManager(models.Manager):
+    """Storage for TokenRevocation rows synced into helper.revocation.RevocationList."""
+
+    def purge_expired(self, batch_size=1000):
+        """Deletes revocations whose tokens have all expired, in batches through the expiry index."""
+        removed = 0
+        while True:
+            ids = list(self.filter(expires_at__lte=timezone.now()).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return removed
+            removed += self.filter(id__in=ids).delete()[0]
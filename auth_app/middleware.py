@@ -1,21 +1,30 @@
 from django.conf import settings
+from django.http import JsonResponse
 from helper.exceptions import SmoothException
 import ipaddress
 
 class InternalAPIMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
-        self.internal_secret_key = getattr(settings, "INTERNAL_SECRET_KEY_KEY", None)
+        self.internal_secret_key = getattr(settings, "INTERNAL_SECRET_KEY", None)
         self.allowed_hosts = {"user-service", "chat-service", "gateway-service"}  
         self.internal_network = ipaddress.ip_network("172.16.0.0/12", strict=False)
 
     def __call__(self, request):
+        try:
+            self.check_internal_request(request)
+        except SmoothException as exc:
+            return JsonResponse(exc.to_dict(), status=exc.status_code)
+
+        return self.get_response(request)
+
+    def check_internal_request(self, request):
         INTERNAL_API_PREFIX = "/api/internal"
 
         if request.path.startswith(INTERNAL_API_PREFIX):
             # Check Auth Header
             auth_header = request.headers.get("X-Service-Auth")
-            if auth_header != self.internal_secret_key:
+            if not self.internal_secret_key or auth_header != self.internal_secret_key:
                 raise SmoothException.error(
                     detail="Invalid service authentication token.",
                     dev_message="Unauthorized service attempted to access internal API.",
@@ -47,5 +56,3 @@ class InternalAPIMiddleware:
                     dev_message=f"Request from unauthorized hostname: {request_host}",
                     status_code=403
                 )
-
-        return self.get_response(request)
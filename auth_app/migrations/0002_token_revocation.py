@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('session', 'Session'), ('user', 'User')], max_length=10)),
+                ('value', models.CharField(db_index=True, max_length=64)),
+                ('keep_session', models.CharField(blank=True, max_length=64, null=True)),
+                ('revoked_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_active_sessions(apps, schema_editor):
+    """Moves unexpired django.contrib.sessions rows that belong to a user into AuthSession."""
+    from django.contrib.sessions.backends.db import SessionStore
+
+    Session = apps.get_model('sessions', 'Session')
+    AuthSession = apps.get_model('auth_app', 'AuthSession')
+    User = apps.get_model('auth_app', 'User')
+
+    user_ids = {str(pk) for pk in User.objects.values_list('id', flat=True)}
+    decoder = SessionStore()
+    batch = []
+
+    for session in Session.objects.filter(expire_date__gt=timezone.now()).iterator(chunk_size=1000):
+        data = decoder.decode(session.session_data)
+        user_id = data.pop('user_id', None)
+        if not user_id or str(user_id) not in user_ids:
+            continue
+
+        batch.append(AuthSession(
+            session_key=session.session_key,
+            user_id=user_id,
+            expire_date=session.expire_date,
+            data=data,
+        ))
+        if len(batch) >= 1000:
+            AuthSession.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+
+    AuthSession.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0002_token_revocation'),
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthSession',
+            fields=[
+                ('session_key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('expire_date', models.DateTimeField(db_index=True)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(copy_active_sessions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+import json
+from django.conf import settings
+from django.db import migrations
+
+
+def compact_permissions(apps, schema_editor):
+    """Replaces the full permission objects stored on each role with their slugs."""
+    Role = apps.get_model('auth_app', 'Role')
+    roles = []
+    for role in Role.objects.only('id', 'permissions').iterator(chunk_size=500):
+        slugs = list(dict.fromkeys(
+            p.get('slug') if isinstance(p, dict) else p for p in role.permissions or []
+        ))
+        if slugs != role.permissions:
+            role.permissions = slugs
+            roles.append(role)
+    Role.objects.bulk_update(roles, ['permissions'], batch_size=500)
+
+
+def expand_permissions(apps, schema_editor):
+    """Restores full permission objects from the catalog."""
+    with open(settings.BASE_DIR / 'data' / 'permissions.json') as f:
+        catalog = {}
+        for perm in json.load(f):
+            catalog.setdefault(perm['slug'], []).append(perm)
+
+    Role = apps.get_model('auth_app', 'Role')
+    roles = []
+    for role in Role.objects.only('id', 'permissions').iterator(chunk_size=500):
+        role.permissions = [
+            perm
+            for slug in role.permissions or [] if isinstance(slug, str)
+            for perm in catalog.get(slug, [])
+        ]
+        roles.append(role)
+    Role.objects.bulk_update(roles, ['permissions'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0003_auth_session'),
+    ]
+
+    operations = [
+        migrations.RunPython(compact_permissions, expand_permissions),
+    ]
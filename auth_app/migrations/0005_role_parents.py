@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+def fill_effective_permissions(apps, schema_editor):
+    """No role has parents yet, so each closure is just the role's own slugs."""
+    Role = apps.get_model('auth_app', 'Role')
+    roles = list(Role.objects.only('id', 'permissions'))
+    for role in roles:
+        role.effective_permissions = sorted({
+            p.get('slug') if isinstance(p, dict) else p for p in role.permissions or []
+        })
+    Role.objects.bulk_update(roles, ['effective_permissions'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0004_compact_role_permissions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='role',
+            name='effective_permissions',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='role',
+            name='parents',
+            field=models.ManyToManyField(blank=True, related_name='children', to='auth_app.role'),
+        ),
+        migrations.RunPython(fill_effective_permissions, migrations.RunPython.noop),
+    ]
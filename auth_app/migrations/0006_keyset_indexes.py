@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0005_role_parents'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='authsession',
+            index=models.Index(fields=['user', 'created_at', 'session_key'], name='authsession_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='role',
+            index=models.Index(fields=['created_at', 'id'], name='role_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['created_at', 'id'], name='user_created_id_idx'),
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractBaseUser
-from auth_app.managers import UserManager
+from auth_app.managers import UserManager, RoleManager, AuthSessionManager, TokenRevocationManager
 from helper.models import UUIDPrimaryKey, TimeLine, IsActiveModel
 from helper.mails import send_new_user_welcome_email, send_password_reset_email
 from PIL import Image, ImageDraw, ImageFont
@@ -12,21 +13,32 @@ from django.core.files.base import ContentFile
 class Role(UUIDPrimaryKey, TimeLine, IsActiveModel):
     """
     Role model for defining user roles.
-    Each role contains a list of permission objects (from permissions.json).
+    Each role stores the slugs of its permissions; full objects live in data/permissions.json
+    and are expanded only where they are displayed (see helper.permissions.expand_permissions).
+    Roles may inherit from parent roles (a DAG); `effective_permissions` holds the precomputed
+    closure of own and inherited slugs and is kept up to date by RoleManager.recompute_closure.
     """
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
 
     permissions = models.JSONField(default=list, blank=True)
+    parents = models.ManyToManyField('self', symmetrical=False, related_name='children', blank=True)
+    effective_permissions = models.JSONField(default=list, editable=False)
     is_system = models.BooleanField(default=False)
     is_super_admin = models.BooleanField(default=False)
 
+    objects = RoleManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['created_at', 'id'], name='role_created_id_idx')]
+
     def __str__(self):
         return self.name
 
     def has_permission(self, slug: str) -> bool:
         """Check if this role contains a permission with given slug."""
-        return self.is_super_admin or any(p.get("slug") == slug for p in self.permissions)
+        from helper.permissions import compile_role_permissions
+        return self.is_super_admin or slug in compile_role_permissions(self).slugs
 
 
 class User(AbstractBaseUser, UUIDPrimaryKey, TimeLine, IsActiveModel):
@@ -56,6 +68,13 @@ class User(AbstractBaseUser, UUIDPrimaryKey, TimeLine, IsActiveModel):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']  
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='user_created_id_idx'),
+            # Case-insensitive email lookups of bulk imports (users_app.transfer).
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
+
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
@@ -109,3 +128,44 @@ class User(AbstractBaseUser, UUIDPrimaryKey, TimeLine, IsActiveModel):
             self.generate_default_profile_picture()
         super().save(*args, **kwargs)
 
+
+
+class TokenRevocation(models.Model):
+    """
+    Durable record of a revoked session or of all tokens issued to a user before `revoked_at`.
+    Synced into helper.revocation.RevocationList for stateless token verification.
+    """
+    SESSION = 'session'
+    USER = 'user'
+    KIND_CHOICES = [(SESSION, 'Session'), (USER, 'User')]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    value = models.CharField(max_length=64, db_index=True)
+    keep_session = models.CharField(max_length=64, null=True, blank=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects: TokenRevocationManager = TokenRevocationManager()
+
+    def __str__(self):
+        return f"{self.kind}:{self.value}"
+
+
+class AuthSession(models.Model):
+    """
+    Compact server-side session backing JWT authentication.
+    Indexed by user for per-user revocation and by expiry for batched purges.
+    """
+    session_key = models.CharField(max_length=40, primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sessions')
+    expire_date = models.DateTimeField(db_index=True)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects: AuthSessionManager = AuthSessionManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'created_at', 'session_key'], name='authsession_user_created_idx')]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.session_key}"
@@ -1,19 +1,36 @@
+import uuid
 import requests
 from django.db import transaction
 from rest_framework import serializers
 from auth_app import models
+from auth_app.attempts import login_attempts, password_reset_attempts
 from users_app.serializers import RoleSerializer
 from users_app.models import Invitation
 from helper.exceptions import SmoothException
-from helper.utils import decode_token, encode_token, create_session, retrieve_session
+from helper.hashing import check_user_password, set_user_password
+from helper.cache import session_cache
+from helper.permissions import compile_role_permissions
+from helper.serializers import DynamicFieldsMixin
+from helper.utils import decode_token, encode_token, create_session, retrieve_session, revoke_user_sessions
+
+
+def get_client_metadata(request):
+    """Client details stored with a login session so it can be recognised in the sessions list."""
+    if request is None:
+        return {}
+    return {
+        "ip_address": request.META.get("REMOTE_ADDR"),
+        "user_agent": request.META.get("HTTP_USER_AGENT", "")[:256],
+    }
 
 
 
 ###################################################################### Authentication ######################################################################
 
 
-class UserSerializer(serializers.ModelSerializer):
-    role = RoleSerializer(read_only=True)
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'role': (RoleSerializer, {})}
+    default_expand = ('role',)
     
     class Meta:
         model = models.User
@@ -86,14 +103,20 @@ class LoginSerializer(serializers.Serializer):
         password = data.get('password')
         login_data = {}
 
-        user : models.User = models.User.objects.filter(email=email).first()
+        # Locked emails/IPs are rejected before any DB lookup or hashing.
+        ip_address = login_attempts.get_client_ip(self.context.get('request'))
+        login_attempts.check(email, ip_address)
+
+        user : models.User = models.User.objects.with_role().filter(email=email).first()
         if not user:
+            login_attempts.register_failure(email, ip_address)
             raise SmoothException.error(
                 detail="User with this email does not exist.",
                 dev_message=f"Login attempt failed: No user found with email {email}"
             )
 
-        if not user.check_password(password):
+        if not check_user_password(user, password):
+            login_attempts.register_failure(email, ip_address)
             raise SmoothException.error(
                 detail="Incorrect password.",
                 dev_message=f"Failed login attempt for user {email}: Incorrect password"
@@ -105,15 +128,18 @@ class LoginSerializer(serializers.Serializer):
                 dev_message=f"Login attempt for deactivated account {email}"
             )
 
+        login_attempts.register_success(email)
 
         session_data = {
             "user_id": str(user.id),
+            **get_client_metadata(self.context.get('request')),
         }
         session_key = create_session(session_data)
         token = encode_token({
-            'session_key' : session_key
+            'session_key' : session_key,
+            'user_id' : str(user.id),
         })
-        user_data = UserSerializer(user).data
+        user_data = UserSerializer(user, context=self.context).data
         
         login_data['user'] = user_data
         login_data['token'] = str(token)
@@ -170,19 +196,21 @@ class SocialLoginSerializer(serializers.Serializer):
         first_name = user_data.get('given_name')
         last_name = user_data.get('family_name')
         
-        user, created = models.User.objects.get_or_create(email=email, first_name=first_name, last_name=last_name)
+        user, created = models.User.objects.with_role().get_or_create(email=email, first_name=first_name, last_name=last_name)
         if created:
                 user.set_unusable_password()
                 user.save()        
         
         session_data = {
             "user_id": str(user.id),
+            **get_client_metadata(self.context.get('request')),
         }
         session_key = create_session(session_data)
         token = encode_token({
-            'session_key' : session_key
+            'session_key' : session_key,
+            'user_id' : str(user.id),
         })
-        user_data = UserSerializer(user).data
+        user_data = UserSerializer(user, context=self.context).data
         
         login_data['user'] = user_data
         login_data['token'] = str(token)
@@ -209,15 +237,19 @@ class ChangePasswordSerializer(serializers.Serializer):
         old_password = data.get("old_password")
         new_password = data.get("new_password")
 
-        if not user.check_password(old_password):
+        if not check_user_password(user, old_password):
             raise SmoothException.error(
                 detail="Incorrect password.",
                 dev_message=f"Password reset failed for user {user.email}: Incorrect old password."
             )
 
-        user.set_password(new_password)
+        set_user_password(user, new_password)
         user.save()
 
+        # Every other session of the user is signed out; the one making this request stays.
+        decoded_payload = getattr(request, "decoded_payload", {}) or {}
+        revoke_user_sessions(user.id, keep_session=decoded_payload.get("session_key"))
+
         return data
 
 
@@ -268,8 +300,9 @@ class PasswordResetSerializer(serializers.Serializer):
             )
 
                 
-        user.set_password(new_password)
+        set_user_password(user, new_password)
         user.save()
+        revoke_user_sessions(user.id)
         return data
     
     def to_representation(self, instance):
@@ -284,6 +317,12 @@ class PasswordResetRequestSerializer(serializers.Serializer):
     def validate(self, data):
         """Validate the email and password, then authenticate and generate a token."""
         email = data.get('email')
+
+        # Every request counts, so reset mails cannot be used to flood an inbox.
+        ip_address = password_reset_attempts.get_client_ip(self.context.get('request'))
+        password_reset_attempts.check(email, ip_address)
+        password_reset_attempts.register_failure(email, ip_address)
+
         user : models.User = models.User.objects.filter(email=email).first()
         if not user:
             raise SmoothException.error(
@@ -291,20 +330,108 @@ class PasswordResetRequestSerializer(serializers.Serializer):
                 dev_message=f"Login attempt failed: No user found with email {email}"
             )
 
-        session_key = create_session({
-            "user_id": str(user.id),
-        }, expiry_seconds=600)
+        # The reset session and its outbox mail commit together, or not at all.
+        with transaction.atomic():
+            session_key = create_session({
+                "user_id": str(user.id),
+                "purpose": "password_reset",
+            }, expiry_seconds=600)
 
-        token = encode_token({
-            'session_key' : session_key
-        })
+            token = encode_token({
+                'session_key' : session_key
+            })
 
-        user.send_password_reset_email(token)        
+            user.send_password_reset_email(token)        
         return data
 
     def to_representation(self, instance):
         return {
             "detail" : "Password reset link sent to your email.",
         }
-        
-        
\ No newline at end of file
+
+
+###################################################################### Internal ######################################################################
+
+
+class TokenIntrospectionSerializer(serializers.Serializer):
+    """
+    Resolves a batch of tokens and/or session keys to compact principals for sibling services.
+    Sessions, then users with their roles, are loaded with one set-based query each,
+    whatever the batch size.
+    """
+    tokens = serializers.ListField(child=serializers.CharField(), required=False, max_length=500, default=list)
+    session_keys = serializers.ListField(child=serializers.CharField(), required=False, max_length=500, default=list)
+
+    def validate(self, data):
+        if not data['tokens'] and not data['session_keys']:
+            raise SmoothException.error(
+                detail="Provide at least one token or session key.",
+                dev_message="Token introspection called with an empty batch."
+            )
+
+        results = []
+        for token in data['tokens']:
+            try:
+                payload = decode_token(token)
+            except SmoothException as exc:
+                results.append({"active": False, "reason": exc.detail})
+                continue
+            results.append({"active": True, "session_key": payload.get("session_key"), "exp": payload.get("exp")})
+
+        for session_key in data['session_keys']:
+            results.append({"active": True, "session_key": session_key, "exp": None})
+
+        sessions = self.load_sessions({r["session_key"] for r in results if r["active"] and r["session_key"]})
+        users = (
+            models.User.objects.select_related('role')
+            .filter(id__in={session["user_id"] for session in sessions.values()})
+            .in_bulk()
+        )
+
+        principals = {}
+        for result in results:
+            if not result["active"]:
+                continue
+
+            session = sessions.get(result["session_key"])
+            if not session or session.get("purpose") == "password_reset":
+                result.update(active=False, reason="Invalid session.")
+                continue
+
+            user = users.get(uuid.UUID(session["user_id"]))
+            if not user or not user.is_active:
+                result.update(active=False, reason="User not found or inactive.")
+                continue
+
+            result["user_id"] = str(user.id)
+            result["exp"] = result["exp"] or int(session["expires_at"])
+            principals.setdefault(result["user_id"], self.principal(user))
+
+        return {"results": results, "principals": principals}
+
+    def load_sessions(self, session_keys):
+        """Session data by key, served from the session cache with a single query for misses."""
+        sessions = {
+            session_key: {**session_data, "expires_at": expires_at}
+            for session_key, (session_data, expires_at) in session_cache.get_many(session_keys).items()
+        }
+
+        missing = session_keys - sessions.keys()
+        rows = models.AuthSession.objects.active().filter(session_key__in=missing).values_list(
+            'session_key', 'user_id', 'data', 'expire_date'
+        ) if missing else []
+        for session_key, user_id, session_data, expire_date in rows:
+            session_data = {**session_data, "user_id": str(user_id)}
+            session_cache.set(session_key, session_data, expire_date.timestamp())
+            sessions[session_key] = {**session_data, "expires_at": expire_date.timestamp()}
+        return sessions
+
+    def principal(self, user):
+        compiled = compile_role_permissions(user.role)
+        return {
+            "email": user.email,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "role": {"id": str(user.role.id), "name": user.role.name, "is_super_admin": user.role.is_super_admin},
+            "permissions": sorted(compiled.slugs),
+        }
@@ -0,0 +1,88 @@
+import uuid
+from django.db import transaction
+from django.utils import timezone
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from helper.cache import session_cache
+from helper.invalidation import invalidation_bus
+from helper.permissions import _compiled_permissions_cache
+from helper.revocation import revocation_list
+from .authentication import principal_cache
+from . import models
+
+
+def publish_on_commit(namespace, key):
+    """Publishes once the surrounding transaction commits, so no worker reloads uncommitted state."""
+    transaction.on_commit(lambda: invalidation_bus.publish(namespace, key))
+
+
+@receiver([post_save, post_delete], sender=models.Role)
+def role_changed(sender, instance, **kwargs):
+    publish_on_commit("role", instance.id)
+
+
+@receiver(post_save, sender=models.Role)
+def recompute_role_closure(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    changed = models.Role.objects.recompute_closure([instance.id])
+    if instance.id in changed:
+        instance.effective_permissions = changed[instance.id]
+
+
+@receiver(m2m_changed, sender=models.Role.parents.through)
+def role_parents_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._cleared_children = set(instance.children.values_list("id", flat=True))
+    elif action in ("post_add", "post_remove", "post_clear"):
+        if not reverse:
+            role_ids = {instance.id}
+        elif action == "post_clear":
+            role_ids = getattr(instance, "_cleared_children", set())
+        else:
+            role_ids = pk_set
+        # Parents are part of the role's representation, so its ETag validators must move.
+        models.Role.objects.filter(id__in=role_ids).update(updated_at=timezone.now())
+        changed = models.Role.objects.recompute_closure(role_ids)
+        if instance.id in changed:
+            instance.effective_permissions = changed[instance.id]
+
+
+@receiver(pre_delete, sender=models.Role)
+def remember_role_children(sender, instance, **kwargs):
+    instance._deleted_children = set(instance.children.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=models.Role)
+def recompute_orphaned_closure(sender, instance, **kwargs):
+    models.Role.objects.recompute_closure(getattr(instance, "_deleted_children", set()))
+
+
+@receiver([post_save, post_delete], sender=models.User)
+def user_changed(sender, instance, **kwargs):
+    publish_on_commit("user", instance.id)
+
+
+def invalidate_role(role_id):
+    _compiled_permissions_cache.pop(uuid.UUID(role_id), None)
+    # Cached principals carry their role, so every one of them may hold the stale copy.
+    principal_cache.clear()
+
+
+def invalidate_user(user_id):
+    principal_cache.delete(user_id)
+
+
+def reset_caches():
+    """Drops every invalidated cache of this process after it missed pruned invalidations."""
+    _compiled_permissions_cache.clear()
+    principal_cache.clear()
+    session_cache.local.clear()
+    revocation_list.sync(force=True)
+
+
+invalidation_bus.subscribe("role", invalidate_role)
+invalidation_bus.subscribe("user", invalidate_user)
+invalidation_bus.subscribe("session", session_cache.local.delete)
+invalidation_bus.subscribe("revocation", lambda key: revocation_list.sync(force=True))
+invalidation_bus.subscribe_reset(reset_caches)
@@ -1,3 +1,89 @@
-from django.test import TestCase
+import uuid
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, RequestFactory, override_settings
+from rest_framework.test import APITestCase
+from auth_app import views
+from auth_app.attempts import LoginAttemptTracker
+from auth_app.models import User, Role
+from helper.exceptions import SmoothException
+from helper.hashing import password_hashing
+from helper.testing import isolated_shared_store
 
-# Create your tests here.
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@isolated_shared_store
+class LoginAttemptTrackerTests(TestCase):
+
+    def setUp(self):
+        LoginAttemptTracker.clear()
+        self.factory = RequestFactory()
+
+    def request(self, forwarded_for):
+        return self.factory.post('/api/auth/login', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded_for)
+
+    def test_forwarded_for_is_ignored_without_trusted_proxies(self):
+        self.assertEqual(LoginAttemptTracker.get_client_ip(self.request('203.0.113.9')), '10.0.0.1')
+
+    def test_forwarded_for_is_parsed_with_trusted_proxies(self):
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            ip = LoginAttemptTracker.get_client_ip(self.request('198.51.100.7, 203.0.113.9'))
+        self.assertEqual(ip, '203.0.113.9')
+
+    @override_settings(LOGIN_LOCKOUT={'login': {'EMAIL_MAX_FAILURES': 100, 'IP_MAX_FAILURES': 3, 'WINDOW': 60, 'LOCKOUT': 60}})
+    def test_rotating_forwarded_for_still_locks_the_ip(self):
+        tracker = LoginAttemptTracker('login')
+        for _ in range(3):
+            ip = tracker.get_client_ip(self.request(f'203.0.113.{uuid.uuid4().int % 250}'))
+            tracker.register_failure(f'{uuid.uuid4().hex}@example.com', ip)
+
+        with self.assertRaises(SmoothException) as raised:
+            tracker.check('fresh@example.com', tracker.get_client_ip(self.request('192.0.2.1')))
+        self.assertEqual(raised.exception.status_code, 429)
+
+    @override_settings(LOGIN_LOCKOUT={'login': {'EMAIL_MAX_FAILURES': 2, 'IP_MAX_FAILURES': 100, 'WINDOW': 60, 'LOCKOUT': 60}})
+    def test_success_resets_the_email_counter(self):
+        tracker = LoginAttemptTracker('login')
+        tracker.register_failure('user@example.com')
+        tracker.register_success('User@Example.com')
+        tracker.register_failure('user@example.com')
+        tracker.check('user@example.com')
+
+        tracker.register_failure('USER@example.com')
+        with self.assertRaises(SmoothException):
+            tracker.check('user@example.com')
+
+
+@isolated_shared_store
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+@mock.patch.object(password_hashing, 'workers', 0)
+@mock.patch.object(views.LoginView, 'throttle_classes', [])
+class LoginLockoutTests(APITestCase):
+
+    def setUp(self):
+        LoginAttemptTracker.clear()
+        role = Role.objects.create(name='Member')
+        User.objects.create(
+            email='member@example.com', role=role, password=make_password('correct-horse'),
+            profile_picture='images/profile_pictures/test.png',
+        )
+
+    def login(self, password, forwarded_for='198.51.100.1'):
+        return self.client.post(
+            '/api/auth/login', {'email': 'member@example.com', 'password': password},
+            format='json', HTTP_X_FORWARDED_FOR=forwarded_for,
+        )
+
+    def test_email_is_locked_after_repeated_failures(self):
+        for attempt in range(settings.LOGIN_LOCKOUT['login']['EMAIL_MAX_FAILURES']):
+            self.assertEqual(self.login('wrong', forwarded_for=f'198.51.100.{attempt}').status_code, 400)
+
+        self.assertEqual(self.login('correct-horse').status_code, 429)
+
+    def test_successful_login_is_not_locked(self):
+        self.login('wrong')
+        res = self.login('correct-horse')
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('token', res.data)
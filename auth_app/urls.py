@@ -9,5 +9,7 @@ urlpatterns = [
     path('change-password', views.ChangePasswordView.as_view(), name='change-password'),
     path('password-reset-request', views.PasswordResetRequestView.as_view(), name='password-reset-request'),
     path('password-reset', views.PasswordResetView.as_view(), name='password-reset'),
+    path('lockouts', views.LoginLockoutView.as_view(), name='lockouts'),
+    path('.well-known/jwks.json', views.JWKSView.as_view(), name='jwks'),
 ]
 
@@ -1,9 +1,17 @@
+import time
+from django.conf import settings
+from django.http import HttpResponse
 from rest_framework import views, generics, status, response
 from . import serializers
 from auth_app import models
 from rest_framework.permissions import AllowAny
-from rest_framework.throttling import ScopedRateThrottle
+from helper.throttling import ScopedRateThrottle
 from helper.utils import delete_session
+from helper.revocation import revocation_list
+from helper.signing import key_ring
+from auth_app.attempts import LoginAttemptTracker
+from auth_app.authentication import ServiceAuthentication
+from extras_app.permissions import IsService
 
 
 class RegisterView(generics.CreateAPIView):
@@ -19,7 +27,7 @@ class LoginView(views.APIView):
     permission_classes = [AllowAny]
 
     def post(self, request):
-        serializer = self.serializer_class(data=request.data)
+        serializer = self.serializer_class(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         login_data = serializer.validated_data
         return response.Response(login_data, status=status.HTTP_200_OK)
@@ -31,6 +39,7 @@ class LogoutView(views.APIView):
         session_key = request.decoded_payload.get('session_key')
         if session_key:
             delete_session(session_key)
+            revocation_list.revoke_session(session_key)
         return response.Response({'detail' : "Successfully logged out"}, status=status.HTTP_200_OK)
 
 
@@ -73,7 +82,59 @@ class SocialLoginView(views.APIView):
     throttle_scope = 'login'
 
     def post(self, request):
-        serializer = self.serializer_class(data=request.data)
+        serializer = self.serializer_class(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         login_data = serializer.validated_data
-        return response.Response(login_data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return response.Response(login_data, status=status.HTTP_200_OK)
+
+
+class JWKSView(views.APIView):
+    """Public JWKS document so sibling services can verify tokens without calling this service."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = []
+
+    def get(self, request):
+        jwks_json, etag = key_ring.jwks()
+        if request.headers.get('If-None-Match') == etag:
+            http_response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            http_response = HttpResponse(jwks_json, content_type='application/json')
+        http_response['ETag'] = etag
+        http_response['Cache-Control'] = f'public, max-age={key_ring.jwks_max_age}'
+        return http_response
+
+
+class LoginLockoutView(views.APIView):
+    """Lists active login/password-reset lockouts and clears them (one key via ?key=, or all)."""
+    permission_slugs = ("auth.lockouts.list", "auth.lockouts.clear")
+
+    def get(self, request):
+        return response.Response(LoginAttemptTracker.list_locks(), status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        cleared = LoginAttemptTracker.clear(request.query_params.get('key'))
+        return response.Response({'detail': f"{cleared} lock(s) cleared."}, status=status.HTTP_200_OK)
+
+
+
+class TokenIntrospectionView(views.APIView):
+    """Internal batch introspection of tokens/session keys; reachable only through /api/internal."""
+    serializer_class = serializers.TokenIntrospectionSerializer
+    authentication_classes = [ServiceAuthentication]
+    permission_classes = [IsService]
+    throttle_classes = []
+
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        introspection = serializer.validated_data
+
+        # Callers may hold the answer until the earliest token expiry, capped by INTROSPECTION_MAX_AGE.
+        now = int(time.time())
+        expiries = [result["exp"] - now for result in introspection["results"] if result["active"]]
+        max_age = max(0, min([settings.INTROSPECTION_MAX_AGE, *expiries]))
+
+        introspection_response = response.Response(introspection, status=status.HTTP_200_OK)
+        introspection_response['Cache-Control'] = f'private, max-age={max_age}'
+        return introspection_response
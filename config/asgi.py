@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Relays outbox mails left pending by a previous run right away, not only after the next mail is queued.
+from helper.mails import outbox_relay
+outbox_relay.start()
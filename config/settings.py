@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
@@ -9,6 +10,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.environ.get('SECRET_KEY')
 
+INTERNAL_SECRET_KEY = os.environ.get('INTERNAL_SECRET_KEY')
+
 DEBUG = True
 
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', '').split(', ')
@@ -42,6 +45,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'auth_app.middleware.InternalAPIMiddleware',
+    'helper.middleware.InvalidationMiddleware',
+    'helper.middleware.QueryBudgetMiddleware',
 ]
 
 CORS_ALLOWED_ORIGINS = os.environ.get('CORS_ALLOWED_ORIGINS').split(', ')
@@ -75,15 +81,19 @@ REST_FRAMEWORK = {
         'helper.permissions.AppPermission',
     ),
     'EXCEPTION_HANDLER': 'helper.exceptions.custom_exception_handler',
+    'DEFAULT_PAGINATION_CLASS': 'helper.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
     'DEFAULT_THROTTLE_CLASSES': (
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'helper.throttling.AnonRateThrottle',
+        'helper.throttling.UserRateThrottle',
     ),
     'DEFAULT_THROTTLE_RATES': {
         'anon': '5/minute',  
         'user': '250/minute', 
         'login': '5/hour',
-    }
+    },
+    # Reverse proxies in front of the app; X-Forwarded-For is ignored for client IPs while this is 0.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
 
 SIMPLE_JWT = {
@@ -91,6 +101,14 @@ SIMPLE_JWT = {
     "UPDATE_LAST_LOGIN": True,
 }
 
+# Asymmetric JWT signing (see helper.signing). Leave ACTIVE_KID unset to keep HS256 with SECRET_KEY.
+JWT_SIGNING = {
+    'KEYS_DIR': os.environ.get('JWT_KEYS_DIR', BASE_DIR / 'keys' / 'jwt'),
+    'ACTIVE_KID': os.environ.get('JWT_ACTIVE_KID'),
+    'ACCEPT_LEGACY_HS256': True,
+    'JWKS_MAX_AGE': 3600,
+}
+
 
 # CACHES = {
 #     "default": {
@@ -109,26 +127,111 @@ SIMPLE_JWT = {
 #     },
 # }
 
+# SQLite file shared by all workers on the host (throttle counters, etc.). Prefer a tmpfs path such as /dev/shm.
+SHARED_STORE_PATH = os.environ.get('SHARED_STORE_PATH', os.path.join(tempfile.gettempdir(), 'gencd_shared_store.sqlite3'))
+
+# Failed-attempt lockouts enforced by auth_app.attempts (WINDOW and LOCKOUT in seconds).
+LOGIN_LOCKOUT = {
+    'login': {'EMAIL_MAX_FAILURES': 5, 'IP_MAX_FAILURES': 50, 'WINDOW': 900, 'LOCKOUT': 900},
+    'password_reset': {'EMAIL_MAX_FAILURES': 3, 'IP_MAX_FAILURES': 20, 'WINDOW': 3600, 'LOCKOUT': 3600},
+}
+
+# Stateless mode verifies tokens locally (signature + revocation list) without reading the session table.
+STATELESS_AUTH = {
+    'ENABLED': os.environ.get('STATELESS_AUTH_ENABLED', 'False') == 'True',
+    'PRINCIPAL_CACHE_TTL': 3600,  # role/user edits are pushed through helper.invalidation
+    'REVOCATION_SYNC_INTERVAL': 5,
+    'REVOCATION_REBUILD_INTERVAL': 3600,
+    'BLOOM_CAPACITY': 100000,
+    'BLOOM_ERROR_RATE': 0.001,
+}
+
+# Upper bound for the Cache-Control max-age on internal token introspection responses.
+INTROSPECTION_MAX_AGE = 30
+
 INVITATION_EXPIRATION_TIME = timedelta(days=1)
 
+# Rows per bulk_create/bulk_update transaction in users_app.transfer imports, and per fetch when exporting.
+# Uploads to POST /api/user/users/import/ are capped at HTTP_MAX_BYTES and may not carry passwords;
+# larger files and password imports go through `manage.py import_users`.
+# Imported users are invited with a password-set link valid for INVITE_EXPIRATION.
+USER_IMPORT = {
+    'CHUNK_SIZE': 1000,
+    'EXPORT_CHUNK_SIZE': 2000,
+    'HTTP_MAX_BYTES': 2 * 1024 * 1024,
+    'INVITE_EXPIRATION': INVITATION_EXPIRATION_TIME,
+}
+
+# Upper bound for rows in one POST /api/user/invitations/bulk/ request (JSON list or CSV upload).
+INVITATION_BULK_MAX_ROWS = 5000
+
 FIELD_ENCRYPTION_KEY = os.environ.get('FIELD_ENCRYPTION_KEY')
 
 FRONTEND_LOGIN_PATH = os.environ.get('FRONTEND_LOGIN_PATH', '/signin')
 
+# Base URL of the frontend used in password reset / password set links.
+FRONTEND_DOMAIN = os.environ.get('FRONTEND_DOMAIN', '')
+
 SESSION_COOKIE_AGE = SIMPLE_JWT.get('ACCESS_TOKEN_LIFETIME', timedelta(days=30)).total_seconds()
 SESSION_COOKIE_SECURE = True
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = 'Lax'
 
+# Per-request query counting (X-Query-Count header); views set `query_budget`, DEFAULT applies otherwise.
+QUERY_BUDGET = {
+    'ENABLED': True,
+    'DEFAULT': None,
+    'RAISE': os.environ.get('QUERY_BUDGET_RAISE', 'False') == 'True',
+}
+
+# data/permissions.json is re-checked (mtime/size, then content hash) at most every CHECK_INTERVAL seconds.
+PERMISSION_CATALOG = {
+    'CHECK_INTERVAL': 2,
+}
+
+# Read-through cache in front of helper.utils.retrieve_session.
+# Deletions are pushed to every worker through helper.invalidation; LOCAL_TTL is only a safety net.
+SESSION_CACHE = {
+    'ENABLED': True,
+    'MAX_ENTRIES': 10000,
+    'LOCAL_TTL': 300,
+    'SHARED_CACHE_ALIAS': os.environ.get('SESSION_CACHE_ALIAS'),  # e.g. 'default' once Redis is enabled
+    'SHARED_TTL': 300,
+}
+
 
 # Email settings
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'smtp.gmail.com')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True') == 'True'
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
 
+# Mail queue drained by helper.mails worker threads, each reusing one SMTP connection; WORKERS = 0 sends inline.
+MAIL_DISPATCHER = {
+    'WORKERS': int(os.environ.get('MAIL_WORKERS', 2)),
+    'QUEUE_SIZE': 10000,
+    'BATCH_SIZE': 50,
+    'MAX_RETRIES': 3,
+    'RETRY_BACKOFF': 2,
+    'IDLE_TIMEOUT': 30,
+    'ENQUEUE_TIMEOUT': 1,
+    'SHUTDOWN_TIMEOUT': 10,
+}
+
+# Transactional outbox (extras_app.OutboxMail) drained into MAIL_DISPATCHER; LEASE and RETRY_BACKOFF in seconds.
+# Set RELAY_IN_PROCESS to False when a dedicated `manage.py drain_outbox` process does the sending.
+MAIL_OUTBOX = {
+    'ENABLED': True,
+    'RELAY_IN_PROCESS': os.environ.get('MAIL_OUTBOX_RELAY_IN_PROCESS', 'True') == 'True',
+    'BATCH_SIZE': 200,
+    'POLL_INTERVAL': 5,
+    'LEASE': 600,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 60,
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -143,6 +246,18 @@ AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},
 ]
 
+# Process pool used by helper.hashing for PBKDF2 work; WORKERS = 0 hashes inline.
+# Each web worker process owns a pool, so the default shares the cores among WEB_CONCURRENCY
+# (gunicorn's worker count) web workers, at most 2 per process. Keep WORKERS x web workers <= cores.
+PASSWORD_HASHING_POOL = {
+    'WORKERS': int(os.environ.get(
+        'PASSWORD_HASHING_WORKERS',
+        max(1, min(2, (os.cpu_count() or 1) // int(os.environ.get('WEB_CONCURRENCY', 1)))),
+    )),
+    'MAX_PENDING': 64,
+    'ACQUIRE_TIMEOUT': 5,
+}
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
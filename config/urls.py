@@ -4,4 +4,5 @@ from django.urls import path, include
 urlpatterns = [
     path('api/auth/', include('auth_app.urls')),
     path('api/user/', include('users_app.urls')),
+    path('api/internal/auth/', include('auth_app.internal_urls')),
 ]
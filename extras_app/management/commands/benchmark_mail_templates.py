@@ -0,0 +1,49 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.template import TemplateDoesNotExist
+from django.template.loader import render_to_string
+from helper.mail_templates import mail_templates
+
+
+class Command(BaseCommand):
+    help = 'Compares render_to_string with the cached mail template renderer on invitation mails'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000, help='Number of mails to render')
+        parser.add_argument('--template', default='email/invitation_org.html', help='Mail template to render')
+
+    def handle(self, *args, **options):
+        template_name = options['template']
+        contexts = [
+            {
+                'invitation_email': f'invitee-{index}@example.com',
+                'join_url': f'https://app.example.com/signin?invitation_id={index}',
+            }
+            for index in range(options['count'])
+        ]
+
+        try:
+            started = time.perf_counter()
+            expected = [render_to_string(template_name, context) for context in contexts]
+            baseline = time.perf_counter() - started
+        except TemplateDoesNotExist:
+            raise CommandError(f"Template '{template_name}' does not exist; pass --template.")
+
+        mail_templates.reset()
+        started = time.perf_counter()
+        single = [mail_templates.render(template_name, context) for context in contexts]
+        cached = time.perf_counter() - started
+
+        started = time.perf_counter()
+        batch = mail_templates.render_many(template_name, contexts)
+        batched = time.perf_counter() - started
+
+        if single != expected or batch != expected:
+            raise CommandError("Cached mail rendering differs from render_to_string.")
+
+        count = len(contexts)
+        for label, seconds in (('render_to_string', baseline), ('cached render', cached), ('render_many', batched)):
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {label:<16} {count} mails | {seconds * 1000:8.1f} ms | "
+                f"{seconds / count * 1e6:6.1f} µs/mail | {baseline / seconds:5.1f}x"
+            ))
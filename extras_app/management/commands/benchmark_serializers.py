@@ -0,0 +1,80 @@
+import time
+from django.db import transaction
+from django.utils import timezone
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from auth_app.models import User, Role
+from extras_app.models import Log
+from extras_app.serializers import LogSerializer
+from users_app.serializers import UserSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compares DRF and compiled list serialization of users and logs on throwaway rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='Row counts to benchmark')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement, the best one is reported')
+
+    def handle(self, *args, **options):
+        largest = max(options['sizes'])
+        with transaction.atomic():
+            self.create_rows(largest)
+            users = list(UserSerializer().prune_queryset(User.objects.with_role()).order_by('-created_at')[:largest])
+            logs = list(LogSerializer().prune_queryset(Log.objects.all()).order_by('-timestamp')[:largest])
+
+            for size in options['sizes']:
+                self.compare('users', UserSerializer, users[:size], options['repeat'])
+                self.compare('logs', LogSerializer, logs[:size], options['repeat'])
+
+            transaction.set_rollback(True)
+
+    def create_rows(self, count):
+        base = Role.objects.create(name='benchmark-base', permissions=['user.list'])
+        role = Role.objects.create(name='benchmark-role', permissions=['logs.list'])
+        role.parents.add(base)
+
+        now = timezone.now()
+        users = User.objects.bulk_create([
+            User(
+                email=f'benchmark-{index}@example.com', first_name=f'First{index}', last_name=f'Last{index}',
+                role=role, created_at=now, updated_at=now, password='!',
+            )
+            for index in range(count)
+        ], batch_size=1000)
+        Log.objects.bulk_create([
+            Log(
+                user=users[index], endpoint=f'/api/users/{index}/', http_method='GET',
+                request_payload={'page': index}, response_payload={'results': [index]}, status_code=200,
+                timestamp=now, latency=0.0125 * (index % 7), ip_address='127.0.0.1',
+                headers={'User-Agent': 'benchmark'}, service='users',
+            )
+            for index in range(count)
+        ], batch_size=1000)
+
+    def compare(self, label, serializer_class, rows, repeat):
+        renderer = JSONRenderer()
+        baseline = serializers.ListSerializer(rows, child=serializer_class())
+        compiled = serializer_class(rows, many=True)
+
+        drf_seconds, drf_data = self.measure(lambda: baseline.to_representation(rows), repeat)
+        fast_seconds, fast_data = self.measure(lambda: compiled.to_representation(rows), repeat)
+
+        if renderer.render(drf_data) != renderer.render(fast_data):
+            raise CommandError(f"Compiled {label} output differs from {serializer_class.__name__}.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {label:<5} {len(rows):>6} rows | DRF {drf_seconds * 1000:8.1f} ms | "
+            f"compiled {fast_seconds * 1000:8.1f} ms | {drf_seconds / fast_seconds:4.1f}x"
+        ))
+
+    @staticmethod
+    def measure(render, repeat):
+        best, data = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = render()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, data
@@ -0,0 +1,41 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from extras_app.models import OutboxMail
+from helper.mails import mail_dispatcher, outbox_relay
+
+
+class Command(BaseCommand):
+    help = 'Delivers pending outbox mails, continuously or once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the due rows, wait for delivery and exit')
+        parser.add_argument('--timeout', type=int, default=120, help='Seconds to wait for delivery with --once')
+        parser.add_argument('--purge-days', type=int, help='Also delete rows sent more than this many days ago')
+
+    def handle(self, *args, **options):
+        if options['purge_days'] is not None:
+            removed = OutboxMail.objects.purge_sent(timedelta(days=options['purge_days']))
+            self.stdout.write(self.style.SUCCESS(f"✅ Purged {removed} sent outbox mails."))
+
+        if not options['once']:
+            self.stdout.write(self.style.WARNING("Relaying outbox mails, press Ctrl+C to stop..."))
+            try:
+                outbox_relay.run()
+            except KeyboardInterrupt:
+                return
+
+        # The relay only claims as many rows as the dispatcher has room for, so drain batch by batch.
+        deadline = time.monotonic() + options['timeout']
+        claimed, flushed = 0, True
+        while flushed:
+            batch = outbox_relay.relay_once()
+            claimed += batch
+            flushed = mail_dispatcher.flush(max(0, deadline - time.monotonic()))
+            if batch < outbox_relay.batch_size:
+                break
+
+        if not flushed:
+            self.stdout.write(self.style.WARNING(f"⚠️ Some mails were still in flight after {options['timeout']}s."))
+        sent, failed = outbox_relay.record_results()
+        self.stdout.write(self.style.SUCCESS(f"✅ Relayed {claimed} outbox mails: {sent} sent, {failed} failed."))
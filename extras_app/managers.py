@@ -0,0 +1,49 @@
+import uuid
+from datetime import timedelta
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxMailManager(models.Manager):
+    """Claiming and bookkeeping for the transactional mail outbox."""
+
+    def claim(self, batch_size, lease):
+        """
+        Leases up to `batch_size` due pending rows to the caller for `lease` seconds.
+
+        Rows are claimed with a conditional UPDATE tagged by a fresh token, so concurrent relays
+        never receive the same row; a relay that dies before reporting back loses its lease and the
+        rows become due again.
+        """
+        now = timezone.now()
+        due = self.filter(status=self.model.Status.PENDING, available_at__lte=now)
+        ids = list(due.order_by('available_at').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+
+        token = uuid.uuid4()
+        due.filter(id__in=ids).update(claim_token=token, available_at=now + timedelta(seconds=lease))
+        return list(self.filter(claim_token=token))
+
+    def mark_sent(self, ids):
+        # The rendered context may hold reset links, so it is not kept once delivered.
+        return self.filter(id__in=ids).update(
+            status=self.model.Status.SENT, sent_at=timezone.now(), context={}, claim_token=None, last_error='',
+        )
+
+    def reschedule(self, failures, max_attempts, backoff):
+        """Puts failed rows ({id: error}) back in the queue with exponential backoff, or fails them for good."""
+        now = timezone.now()
+        for row in self.filter(id__in=failures).only('id', 'attempts'):
+            attempts = row.attempts + 1
+            values = {'attempts': attempts, 'claim_token': None, 'last_error': str(failures[row.id])[:2000]}
+            if attempts >= max_attempts:
+                values['status'] = self.model.Status.FAILED
+            else:
+                values['available_at'] = now + timedelta(seconds=backoff * 2 ** (attempts - 1))
+            self.filter(id=row.id).update(**values)
+
+    def purge_sent(self, older_than):
+        """Deletes rows delivered more than `older_than` ago. Returns the number of rows removed."""
+        deleted, _ = self.filter(status=self.model.Status.SENT, sent_at__lt=timezone.now() - older_than).delete()
+        return deleted
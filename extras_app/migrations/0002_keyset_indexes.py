@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extras_app', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['timestamp', 'id'], name='log_timestamp_id_idx'),
+        ),
+    ]
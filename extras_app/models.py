@@ -4,8 +4,10 @@ import json
 import base64
 import logging 
 from django.db import models
+from django.utils import timezone
 from auth_app.models import User
 from helper.models import UUIDPrimaryKey
+from .managers import OutboxMailManager
 from django.core.exceptions import ValidationError
 
 logger = logging.getLogger(__name__)
@@ -111,5 +113,41 @@ class Log(UUIDPrimaryKey):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [models.Index(fields=['timestamp', 'id'], name='log_timestamp_id_idx')]
     
-    
\ No newline at end of file
+    
+
+
+class OutboxMail(UUIDPrimaryKey):
+    """
+    Mail written in the same transaction as the change that triggers it and delivered by
+    helper.mails.outbox_relay once committed; rows of rolled back transactions never exist.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    subject = models.CharField(max_length=255)
+    receiver_email = models.EmailField()
+    template_name = models.CharField(max_length=255)
+    context = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    objects = OutboxMailManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbox_status_available_idx'),
+            models.Index(fields=['claim_token'], name='outbox_claim_token_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.receiver_email} - {self.subject} - {self.status}"
@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from extras_app import models
+from helper.serializers import DynamicFieldsMixin, CompiledListSerializer
 
-class LogSerializer(serializers.ModelSerializer):
+class LogSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Log
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        list_serializer_class = CompiledListSerializer
\ No newline at end of file
@@ -1,3 +1,101 @@
-from django.test import TestCase
+from unittest import mock
+from django.test import TestCase, override_settings
+from auth_app.models import User, Role, AuthSession
+from auth_app.serializers import PasswordResetRequestSerializer
+from auth_app.attempts import LoginAttemptTracker
+from extras_app.models import OutboxMail
+from helper.mails import OutboxRelay, outbox_relay
+from helper.testing import isolated_shared_store
+from users_app.models import Invitation
+from users_app.serializers import InvitationSerializer
 
-# Create your tests here.
+
+@isolated_shared_store
+class OutboxTransactionTests(TestCase):
+
+    def setUp(self):
+        LoginAttemptTracker.clear()
+        self.role = Role.objects.create(name='Member')
+
+    def invite(self):
+        serializer = InvitationSerializer(data={
+            'to_email': 'new@example.com', 'from_email': 'admin@example.com',
+            'access_url': 'https://app.example.com/', 'role_id': str(self.role.id),
+        })
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_invitation_and_its_mail_commit_together(self):
+        with self.captureOnCommitCallbacks() as callbacks, mock.patch.object(outbox_relay, 'wake') as wake:
+            invitation = self.invite()
+
+        self.assertEqual(OutboxMail.objects.get().receiver_email, invitation.to_email)
+        for callback in callbacks:
+            callback()
+        wake.assert_called_once()
+
+    def test_failed_outbox_insert_rolls_back_the_invitation(self):
+        with mock.patch.object(OutboxMail.objects, 'create', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                self.invite()
+
+        self.assertFalse(Invitation.objects.exists())
+
+    @override_settings(FRONTEND_DOMAIN='https://app.example.com')
+    def test_password_reset_session_and_mail_commit_together(self):
+        user = User.objects.create(email='member@example.com', role=self.role, profile_picture='images/profile_pictures/test.png')
+        serializer = PasswordResetRequestSerializer(data={'email': user.email}, context={'request': None})
+
+        with mock.patch.object(OutboxMail.objects, 'create', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                serializer.is_valid()
+        self.assertFalse(AuthSession.objects.filter(user=user).exists())
+
+        serializer = PasswordResetRequestSerializer(data={'email': user.email}, context={'request': None})
+        serializer.is_valid(raise_exception=True)
+        self.assertTrue(AuthSession.objects.filter(user=user, data__purpose='password_reset').exists())
+        self.assertEqual(OutboxMail.objects.get().template_name, 'email/password_reset.html')
+
+
+@isolated_shared_store
+class OutboxRelayStartTests(TestCase):
+
+    def relay(self, **config):
+        with override_settings(MAIL_OUTBOX={'ENABLED': True, 'RELAY_IN_PROCESS': True, **config}):
+            return OutboxRelay()
+
+    @mock.patch('helper.mails.threading.Thread')
+    def test_start_runs_the_relay_right_away(self, thread):
+        relay = self.relay()
+        relay.start()
+        relay.start()
+
+        thread.assert_called_once_with(target=relay.run, name='mail-outbox-relay', daemon=True)
+        self.assertTrue(relay._wake.is_set())
+
+    @mock.patch('helper.mails.threading.Thread')
+    def test_start_is_a_no_op_for_dedicated_relays(self, thread):
+        self.relay(RELAY_IN_PROCESS=False).start()
+        thread.assert_not_called()
+
+    def test_relay_once_claims_rows_left_by_a_previous_run(self):
+        OutboxMail.objects.create(subject='Hi', receiver_email='a@example.com', template_name='email/x.html')
+        relay = self.relay()
+
+        with mock.patch('helper.mails.mail_dispatcher.enqueue') as enqueue:
+            self.assertEqual(relay.relay_once(), 1)
+
+        self.assertEqual(enqueue.call_args[0][0].receiver_email, 'a@example.com')
+
+    def test_relay_once_only_tops_the_dispatcher_up_to_the_batch_size(self):
+        for index in range(3):
+            OutboxMail.objects.create(subject='Hi', receiver_email=f'{index}@example.com', template_name='email/x.html')
+        relay = self.relay(BATCH_SIZE=2)
+
+        with mock.patch('helper.mails.mail_dispatcher.enqueue'):
+            with mock.patch('helper.mails.mail_dispatcher.pending', 2):
+                self.assertEqual(relay.relay_once(), 0)
+            with mock.patch('helper.mails.mail_dispatcher.pending', 1):
+                self.assertEqual(relay.relay_once(), 1)
+
+        self.assertEqual(OutboxMail.objects.filter(claim_token__isnull=True).count(), 2)
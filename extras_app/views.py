@@ -16,6 +16,13 @@ class LogReadOnlyViewSet(ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_class = filters.LogFilter
     ordering_fields = ['timestamp']
+    keyset_ordering = ('-timestamp',)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = self.get_serializer().prune_queryset(queryset)
+        return queryset
     
     
 
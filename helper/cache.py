@@ -0,0 +1,144 @@
+import time
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+
+
+class TTLCache:
+    """
+    Thread-safe, per-process LRU cache where every entry carries its own expiry.
+    """
+
+    def __init__(self, max_entries=10000, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at=None):
+        """Stores a value until `expires_at` (epoch seconds), capped at the cache TTL."""
+        deadline = time.time() + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+
+        with self._lock:
+            self._data[key] = (value, deadline)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SessionCache:
+    """
+    Two-tier read-through cache for resolved sessions.
+
+    The local tier is a per-process TTLCache. The shared tier is an optional Django
+    cache alias (e.g. Redis) configured through settings.SESSION_CACHE. Entries never
+    outlive the session they describe, and `delete` drops the key from both tiers.
+    """
+
+    key_prefix = "auth_session:"
+
+    def __init__(self):
+        config = getattr(settings, "SESSION_CACHE", {})
+        self.enabled = config.get("ENABLED", True)
+        self.local = TTLCache(
+            max_entries=config.get("MAX_ENTRIES", 10000),
+            ttl=config.get("LOCAL_TTL", 5),
+        )
+        self.shared_alias = config.get("SHARED_CACHE_ALIAS")
+        self.shared_ttl = config.get("SHARED_TTL", 300)
+
+    @property
+    def shared(self):
+        if not self.shared_alias:
+            return None
+        return caches[self.shared_alias]
+
+    def get(self, session_key):
+        if not self.enabled:
+            return None
+
+        entry = self.local.get(session_key)
+        if entry is not None:
+            return entry[0]
+
+        if self.shared is None:
+            return None
+
+        entry = self.shared.get(self.key_prefix + session_key)
+        if entry is None:
+            return None
+
+        session_data, expires_at = entry
+        if expires_at <= time.time():
+            return None
+
+        self.local.set(session_key, entry, expires_at)
+        return session_data
+
+    def get_many(self, session_keys):
+        """Returns {session_key: (session_data, expires_at)} for the keys found in either tier."""
+        if not self.enabled:
+            return {}
+
+        found = {}
+        for session_key in session_keys:
+            entry = self.local.get(session_key)
+            if entry is not None:
+                found[session_key] = entry
+
+        missing = [self.key_prefix + session_key for session_key in session_keys if session_key not in found]
+        if self.shared is not None and missing:
+            now = time.time()
+            for key, entry in self.shared.get_many(missing).items():
+                if entry[1] > now:
+                    found[key[len(self.key_prefix):]] = entry
+                    self.local.set(key[len(self.key_prefix):], entry, entry[1])
+        return found
+
+    def set(self, session_key, session_data, expires_at):
+        if not self.enabled:
+            return
+
+        entry = (session_data, expires_at)
+        self.local.set(session_key, entry, expires_at)
+
+        if self.shared is not None:
+            timeout = min(self.shared_ttl, int(expires_at - time.time()))
+            if timeout > 0:
+                self.shared.set(self.key_prefix + session_key, entry, timeout=timeout)
+
+    def delete(self, session_key):
+        self.local.delete(session_key)
+        if self.shared is not None:
+            self.shared.delete(self.key_prefix + session_key)
+
+
+session_cache = SessionCache()
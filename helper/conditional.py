@@ -0,0 +1,116 @@
+import hashlib
+from datetime import datetime
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import response, status
+from .exceptions import SmoothException
+
+
+def _etag_list(header):
+    return [tag.strip() for tag in header.split(',')]
+
+
+class ConditionalRequestMixin:
+    """
+    ETag / Last-Modified validators for views over TimeLine models.
+
+    Detail validators come from the object's `updated_at` (plus the `updated_at` of the relations in
+    `validator_related`, which are part of the representation). List validators come from a single
+    count + max(updated_at) aggregate on the filtered queryset and the full request path.
+    A matching If-None-Match / If-Modified-Since answers 304 before any serializer runs,
+    and PUT/PATCH/DELETE with a stale If-Match answer 412.
+    """
+
+    validator_related = ()
+
+    def get_validator_parts(self, obj):
+        parts = [str(obj.pk), obj.updated_at]
+        for name in self.validator_related:
+            related = getattr(obj, name, None)
+            parts.append(related.updated_at if related is not None else None)
+        return parts
+
+    def get_list_validator_parts(self, queryset):
+        aggregates = {'count': Count('pk'), 'updated_at': Max('updated_at')}
+        for name in self.validator_related:
+            aggregates[name] = Max(f'{name}__updated_at')
+        return [self.request.get_full_path(), *queryset.order_by().aggregate(**aggregates).values()]
+
+    @staticmethod
+    def make_validators(parts):
+        etag = '"%s"' % hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+        last_modified = max((part for part in parts if isinstance(part, datetime)), default=None)
+        return etag, last_modified
+
+    def is_not_modified(self, etag, last_modified):
+        if_none_match = self.request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = _etag_list(if_none_match)
+            return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+        since = parse_http_date_safe(self.request.headers.get('If-Modified-Since', ''))
+        return since is not None and last_modified is not None and int(last_modified.timestamp()) <= since
+
+    @staticmethod
+    def set_validators(http_response, etag, last_modified):
+        http_response['ETag'] = etag
+        if last_modified is not None:
+            http_response['Last-Modified'] = http_date(last_modified.timestamp())
+        http_response['Cache-Control'] = 'private, no-cache'
+        return http_response
+
+    def conditional_response(self, parts, render):
+        """Returns 304 when the client's validators match `parts`, otherwise the response built by `render()`."""
+        etag, last_modified = self.make_validators(parts)
+        if self.is_not_modified(etag, last_modified):
+            http_response = response.Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            http_response = render()
+        return self.set_validators(http_response, etag, last_modified)
+
+    def check_if_match(self, instance):
+        """Compares If-Match against the row as currently committed, locking it for the rest of the transaction."""
+        if_match = self.request.headers.get('If-Match')
+        if if_match is None or if_match.strip() == '*':
+            return
+
+        instance.updated_at = (
+            type(instance).objects.select_for_update()
+            .filter(pk=instance.pk).values_list('updated_at', flat=True).get()
+        )
+        etag, _ = self.make_validators(self.get_validator_parts(instance))
+        if etag not in _etag_list(if_match):
+            raise SmoothException.warning(
+                detail="This item was changed by someone else. Reload it and try again.",
+                dev_message=f"If-Match {if_match} does not match current ETag {etag}",
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+            )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return self.conditional_response(
+            self.get_validator_parts(instance),
+            lambda: response.Response(self.get_serializer(instance).data),
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(
+            self.get_list_validator_parts(queryset),
+            lambda: super(ConditionalRequestMixin, self).list(request, *args, **kwargs),
+        )
+
+    def update(self, request, *args, **kwargs):
+        if 'If-Match' not in request.headers:
+            return super().update(request, *args, **kwargs)
+        with transaction.atomic():
+            self.check_if_match(self.get_object())
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        if 'If-Match' not in request.headers:
+            return super().destroy(request, *args, **kwargs)
+        with transaction.atomic():
+            self.check_if_match(self.get_object())
+            return super().destroy(request, *args, **kwargs)
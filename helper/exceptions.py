@@ -37,20 +37,20 @@ class SmoothException(Exception):
         }
     
     @classmethod
-    def info(cls, detail, dev_message=None, redirect_url='Not applicable'):
-        return cls(detail, dev_message, type="info", redirect_url=redirect_url, status_code=400)
+    def info(cls, detail, dev_message=None, redirect_url='Not applicable', status_code=400):
+        return cls(detail, dev_message, type="info", redirect_url=redirect_url, status_code=status_code)
     
     @classmethod
-    def warning(cls, detail, dev_message=None, redirect_url='Not applicable'):
-        return cls(detail, dev_message, type="warning", redirect_url=redirect_url, status_code=400)
+    def warning(cls, detail, dev_message=None, redirect_url='Not applicable', status_code=400):
+        return cls(detail, dev_message, type="warning", redirect_url=redirect_url, status_code=status_code)
     
     @classmethod
-    def error(cls, detail, dev_message=None, redirect_url='Not applicable'):
-        return cls(detail, dev_message, type="error", redirect_url=redirect_url, status_code=400)
+    def error(cls, detail, dev_message=None, redirect_url='Not applicable', status_code=400):
+        return cls(detail, dev_message, type="error", redirect_url=redirect_url, status_code=status_code)
     
     @classmethod
-    def critical(cls, detail, dev_message=None, redirect_url='Not applicable'):
-        return cls(detail, dev_message, type="critical", redirect_url=redirect_url, status_code=400)
+    def critical(cls, detail, dev_message=None, redirect_url='Not applicable', status_code=400):
+        return cls(detail, dev_message, type="critical", redirect_url=redirect_url, status_code=status_code)
 
 
 
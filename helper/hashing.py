@@ -0,0 +1,168 @@
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from .exceptions import SmoothException
+
+logger = logging.getLogger(__name__)
+
+
+def _initialize_worker():
+    """Makes sure Django is configured in pool processes started with the 'spawn' method."""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _make_password(raw_password):
+    return make_password(raw_password)
+
+
+def _check_password(raw_password, encoded):
+    return check_password(raw_password, encoded)
+
+
+class PasswordHashingService:
+    """
+    Bounded process pool for PBKDF2 work, so hashing runs off the request thread.
+    Every web worker process has its own pool; WORKERS is per process (see PASSWORD_HASHING_POOL).
+
+    At most MAX_PENDING jobs may be queued or running; callers beyond that wait up to
+    ACQUIRE_TIMEOUT seconds for a slot and are then rejected with a 503.
+    WORKERS = 0 hashes inline on the calling thread.
+    """
+
+    def __init__(self):
+        config = getattr(settings, "PASSWORD_HASHING_POOL", {})
+        self.workers = config.get("WORKERS", 1)
+        self.max_pending = config.get("MAX_PENDING", max(1, self.workers) * 8)
+        self.acquire_timeout = config.get("ACQUIRE_TIMEOUT", 5)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self):
+        """Jobs submitted to the pool that have not finished yet."""
+        return self.pending
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "queue_depth": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def _get_executor(self):
+        # The pool is created lazily and per process, so forked web workers never share one.
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_initialize_worker)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _release(self, future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def submit(self, fn, *args) -> Future:
+        if not self.workers:
+            future = Future()
+            future.set_result(fn(*args))
+            return future
+
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self.rejected += 1
+            logger.warning("Password hashing pool saturated: %s", self.stats())
+            raise SmoothException(
+                detail="The server is busy. Please try again in a moment.",
+                dev_message=f"Password hashing queue is full ({self.max_pending} pending jobs).",
+                status_code=503,
+            )
+
+        with self._lock:
+            self.pending += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            # The job never ran, so it frees its slot without counting as completed.
+            with self._lock:
+                self.pending -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def hash(self, raw_password):
+        return self.submit(_make_password, raw_password).result()
+
+    def hash_many(self, raw_passwords):
+        """Hashes a batch in parallel; submission waits for free slots, so at most MAX_PENDING run at once."""
+        futures = [self.submit(_make_password, raw_password) for raw_password in raw_passwords]
+        return [future.result() for future in futures]
+
+    def verify(self, raw_password, encoded):
+        return self.submit(_check_password, raw_password, encoded).result()
+
+    async def ahash(self, raw_password):
+        return await asyncio.wrap_future(self.submit(_make_password, raw_password))
+
+    async def averify(self, raw_password, encoded):
+        return await asyncio.wrap_future(self.submit(_check_password, raw_password, encoded))
+
+
+password_hashing = PasswordHashingService()
+
+
+def password_needs_rehash(encoded):
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = get_hasher("default")
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+def set_user_password(user, raw_password):
+    """Pool-backed equivalent of user.set_password()."""
+    if raw_password is None:
+        user.set_unusable_password()
+        return
+    user.password = password_hashing.hash(raw_password)
+    user._password = raw_password
+
+
+def check_user_password(user, raw_password):
+    """Pool-backed equivalent of user.check_password(), including the hash upgrade on success."""
+    if not password_hashing.verify(raw_password, user.password):
+        return False
+
+    if password_needs_rehash(user.password):
+        set_user_password(user, raw_password)
+        user.save(update_fields=["password"])
+    return True
+
+
+async def acheck_user_password(user, raw_password):
+    """Async variant of check_user_password() for async views; awaits the pool instead of blocking."""
+    if not await password_hashing.averify(raw_password, user.password):
+        return False
+
+    if password_needs_rehash(user.password):
+        user.password = await password_hashing.ahash(raw_password)
+        user._password = raw_password
+        await user.asave(update_fields=["password"])
+    return True
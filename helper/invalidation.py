@@ -0,0 +1,176 @@
+import os
+import time
+import random
+import logging
+import threading
+from collections import defaultdict
+from .shared_store import shared_store
+
+logger = logging.getLogger(__name__)
+
+shared_store.register_schema("""
+    CREATE TABLE IF NOT EXISTS invalidation_sequence (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        seq INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO invalidation_sequence (id, seq) VALUES (1, 0);
+    CREATE TABLE IF NOT EXISTS invalidation_versions (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        seq INTEGER NOT NULL,
+        PRIMARY KEY (namespace, key)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS invalidation_versions_seq ON invalidation_versions (seq);
+    CREATE TABLE IF NOT EXISTS invalidation_horizon (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        seq INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO invalidation_horizon (id, seq) VALUES (1, 0);
+    CREATE TABLE IF NOT EXISTS invalidation_pollers (
+        pid INTEGER PRIMARY KEY,
+        seq INTEGER NOT NULL,
+        polled_at REAL NOT NULL
+    );
+""")
+
+
+class InvalidationBus:
+    """
+    Cross-process cache invalidation over the host-wide shared store.
+
+    `publish` bumps a monotonically increasing version for (namespace, key) and a global
+    sequence number. Every worker calls `poll` once per request: a single-row read of the
+    sequence, and only when it moved, a read of the changed keys, which are handed to the
+    handlers subscribed for their namespace. Hot caches can therefore live indefinitely
+    and still observe every change made by any worker on the host.
+
+    Each process records the sequence it has applied in `invalidation_pollers` (when it moves,
+    and at least every HEARTBEAT_INTERVAL seconds while requests come in). `prune` deletes the
+    rows every live process has applied; a process idle for longer than POLLER_TTL no longer holds
+    them back and, once it polls again past the pruned horizon, drops its caches through the
+    `subscribe_reset` handlers instead of replaying the missing keys.
+    """
+
+    heartbeat_interval = 60
+    poller_ttl = 900
+    prune_probability = 0.01
+
+    def __init__(self):
+        self._handlers = defaultdict(list)
+        self._reset_handlers = []
+        self._lock = threading.Lock()
+        self._seen_seq = None
+        self._heartbeat_at = 0.0
+
+    def subscribe(self, namespace, handler):
+        """Registers `handler(key)` to run when `key` in `namespace` is published by any process."""
+        self._handlers[namespace].append(handler)
+
+    def subscribe_reset(self, handler):
+        """Registers `handler()` to drop a whole cache when this process missed pruned invalidations."""
+        self._reset_handlers.append(handler)
+
+    def publish(self, namespace, key):
+        key = str(key)
+        with shared_store.transaction() as connection:
+            connection.execute("UPDATE invalidation_sequence SET seq = seq + 1 WHERE id = 1")
+            seq = connection.execute("SELECT seq FROM invalidation_sequence WHERE id = 1").fetchone()[0]
+            connection.execute(
+                "INSERT INTO invalidation_versions (namespace, key, version, seq) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(namespace, key) DO UPDATE SET version = version + 1, seq = excluded.seq",
+                (namespace, key, seq),
+            )
+            version = connection.execute(
+                "SELECT version FROM invalidation_versions WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()[0]
+            if random.random() < self.prune_probability:
+                self._prune(connection)
+
+        # The publishing process applies its own change right away.
+        self._dispatch(namespace, key)
+        return version
+
+    def publish_many(self, namespace, keys):
+        """Publishes many keys of one namespace with a single shared-store transaction."""
+        keys = [str(key) for key in keys]
+        if not keys:
+            return
+        with shared_store.transaction() as connection:
+            connection.execute("UPDATE invalidation_sequence SET seq = seq + 1 WHERE id = 1")
+            seq = connection.execute("SELECT seq FROM invalidation_sequence WHERE id = 1").fetchone()[0]
+            connection.executemany(
+                "INSERT INTO invalidation_versions (namespace, key, version, seq) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(namespace, key) DO UPDATE SET version = version + 1, seq = excluded.seq",
+                [(namespace, key, seq) for key in keys],
+            )
+            if random.random() < self.prune_probability:
+                self._prune(connection)
+
+        for key in keys:
+            self._dispatch(namespace, key)
+
+    def version(self, namespace, key):
+        """Current version of (namespace, key); starts over from 0 once the row has been pruned."""
+        row = shared_store.connection().execute(
+            "SELECT version FROM invalidation_versions WHERE namespace = ? AND key = ?", (namespace, str(key))
+        ).fetchone()
+        return row[0] if row else 0
+
+    def poll(self):
+        connection = shared_store.connection()
+        current = connection.execute("SELECT seq FROM invalidation_sequence WHERE id = 1").fetchone()[0]
+        if current == self._seen_seq and time.monotonic() - self._heartbeat_at < self.heartbeat_interval:
+            return
+
+        changes, reset = [], False
+        with self._lock:
+            # Nothing has been cached before the first poll, so there is nothing to replay then.
+            if self._seen_seq is not None and current != self._seen_seq:
+                changes = connection.execute(
+                    "SELECT namespace, key FROM invalidation_versions WHERE seq > ?", (self._seen_seq,)
+                ).fetchall()
+                # Read after the changes, so a prune racing with this poll is noticed rather than missed.
+                horizon = connection.execute("SELECT seq FROM invalidation_horizon WHERE id = 1").fetchone()[0]
+                if self._seen_seq < horizon:
+                    changes, reset = [], True
+            self._seen_seq = current
+            self._heartbeat_at = time.monotonic()
+            connection.execute(
+                "INSERT INTO invalidation_pollers (pid, seq, polled_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(pid) DO UPDATE SET seq = excluded.seq, polled_at = excluded.polled_at",
+                (os.getpid(), current, time.time()),
+            )
+
+        if reset:
+            logger.warning("Invalidations before seq %s were pruned while this process was idle; dropping caches", current)
+            for handler in self._reset_handlers:
+                try:
+                    handler()
+                except Exception:
+                    logger.exception("Invalidation reset handler failed")
+        for namespace, key in changes:
+            self._dispatch(namespace, key)
+
+    def prune(self):
+        """Deletes the versions every live process has applied. Returns the number of rows removed."""
+        with shared_store.transaction() as connection:
+            return self._prune(connection)
+
+    def _prune(self, connection):
+        connection.execute("DELETE FROM invalidation_pollers WHERE polled_at < ?", (time.time() - self.poller_ttl,))
+        horizon = connection.execute("SELECT MIN(seq) FROM invalidation_pollers").fetchone()[0]
+        if horizon is None:
+            return 0
+        connection.execute("UPDATE invalidation_horizon SET seq = MAX(seq, ?) WHERE id = 1", (horizon,))
+        return connection.execute("DELETE FROM invalidation_versions WHERE seq <= ?", (horizon,)).rowcount
+
+    def _dispatch(self, namespace, key):
+        for handler in self._handlers.get(namespace, []):
+            try:
+                handler(key)
+            except Exception:
+                logger.exception("Invalidation handler failed for %s:%s", namespace, key)
+
+
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,89 @@
+import threading
+from django.dispatch import receiver
+from django.core.signals import setting_changed
+from django.template import Context, Engine, engines
+from django.template.backends.django import DjangoTemplates
+from django.utils.autoreload import file_changed
+
+
+class MailTemplateRenderer:
+    """
+    Renders mail templates from a private template engine whose loaders are always cached.
+
+    The engine mirrors the project's DjangoTemplates engine (dirs, loaders, libraries, autoescape),
+    but unlike the project engine under DEBUG it reads and compiles each template once
+    per process. Output is the same as `render_to_string(template_name, context)` without a request.
+    `render_many` renders a list of contexts against one compiled template.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engine = None
+        self._templates = {}
+
+    @staticmethod
+    def _build_engine():
+        project = next(backend.engine for backend in engines.all() if isinstance(backend, DjangoTemplates))
+        loaders = project.loaders
+        if loaders and loaders[0][0] == "django.template.loaders.cached.Loader":
+            loaders = loaders[0][1]
+
+        return Engine(
+            dirs=project.dirs,
+            loaders=[("django.template.loaders.cached.Loader", loaders)],
+            libraries=project.libraries,
+            builtins=[builtin for builtin in project.builtins if builtin not in Engine.default_builtins],
+            string_if_invalid=project.string_if_invalid,
+            file_charset=project.file_charset,
+            autoescape=project.autoescape,
+        )
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = self._build_engine()
+        return self._engine
+
+    def get_template(self, template_name):
+        template = self._templates.get(template_name)
+        if template is None:
+            template = self.engine.get_template(template_name)
+            self._templates[template_name] = template
+        return template
+
+    def render(self, template_name, context=None):
+        return self.get_template(template_name).render(Context(context or {}, autoescape=self.engine.autoescape))
+
+    def render_many(self, template_name, contexts):
+        """Renders every context with one compiled template and one reusable Context."""
+        template = self.get_template(template_name)
+        context = Context(autoescape=self.engine.autoescape)
+        rendered = []
+        for values in contexts:
+            with context.push(values):
+                rendered.append(template.render(context))
+        return rendered
+
+    def reset(self):
+        """Drops compiled templates, e.g. after templates changed on disk."""
+        with self._lock:
+            self._engine = None
+            self._templates = {}
+
+
+mail_templates = MailTemplateRenderer()
+
+
+@receiver(file_changed, dispatch_uid="mail_templates_reset")
+def reset_mail_templates(sender, file_path, **kwargs):
+    # The development autoreloader only resets the project engines; keep edited mail templates visible too.
+    if file_path.suffix in (".html", ".txt"):
+        mail_templates.reset()
+
+
+@receiver(setting_changed, dispatch_uid="mail_templates_settings")
+def reset_mail_templates_on_settings(sender, setting, **kwargs):
+    if setting == "TEMPLATES":
+        mail_templates.reset()
@@ -1,31 +1,398 @@
-from django.core.mail import EmailMessage
-from django.template.loader import render_to_string
-from django.conf import settings
+import time
+import heapq
+import smtplib
+import queue
+import atexit
+import logging
+import itertools
+import os
 import threading
+from functools import partial
+from django.apps import apps
+from django.db import close_old_connections, transaction
+from django.core.mail import EmailMessage, get_connection
+from django.conf import settings
+from .mail_templates import mail_templates
+
+logger = logging.getLogger(__name__)
+
 
+class Mail:
+    """
+    One queued message; rendered by the worker that sends it.
+    `on_done(error)` is called once delivery succeeded (error None) or was given up.
+    """
 
-class EmailThread(threading.Thread):
-    def __init__(self, subject, receiver_email, template_name, context):
+    __slots__ = ("subject", "receiver_email", "template_name", "context", "attempts", "on_done")
+
+    def __init__(self, subject, receiver_email, template_name, context, on_done=None):
         self.subject = subject
         self.receiver_email = receiver_email
         self.template_name = template_name
         self.context = context
-        super().__init__()
+        self.attempts = 0
+        self.on_done = on_done
 
-    def run(self):
-        html_content = render_to_string(self.template_name, self.context)
+    def build(self, connection=None, body=None):
         email = EmailMessage(
             subject=self.subject,
-            body=html_content,
+            body=mail_templates.render(self.template_name, self.context) if body is None else body,
             from_email=settings.EMAIL_HOST_USER,
             to=[self.receiver_email],
+            connection=connection,
+        )
+        email.content_subtype = "html"
+        return email
+
+
+class MailDispatcher:
+    """
+    Bounded mail queue drained by a fixed pool of worker threads.
+
+    Each worker keeps one connection from the configured EMAIL_BACKEND open and sends up to
+    BATCH_SIZE queued mails over it before waiting again; the connection is closed after
+    IDLE_TIMEOUT seconds without work. A failed send drops the connection and is retried up to
+    MAX_RETRIES times after RETRY_BACKOFF * 2 ** (attempt - 1) seconds. When the queue is full,
+    callers wait ENQUEUE_TIMEOUT seconds and the mail is then dropped and counted.
+    WORKERS = 0 sends inline on the calling thread.
+    """
+
+    def __init__(self):
+        config = getattr(settings, "MAIL_DISPATCHER", {})
+        self.workers = config.get("WORKERS", 2)
+        self.queue_size = config.get("QUEUE_SIZE", 10000)
+        self.batch_size = config.get("BATCH_SIZE", 50)
+        self.max_retries = config.get("MAX_RETRIES", 3)
+        self.retry_backoff = config.get("RETRY_BACKOFF", 2)
+        self.idle_timeout = config.get("IDLE_TIMEOUT", 30)
+        self.enqueue_timeout = config.get("ENQUEUE_TIMEOUT", 1)
+        self.shutdown_timeout = config.get("SHUTDOWN_TIMEOUT", 10)
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        self._sequence = itertools.count()
+        self._queue = None
+        self._retries = []  # heap of (due, sequence, mail)
+        self._pid = None
+        self.pending = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.connections_opened = 0
+
+    @property
+    def queue_depth(self):
+        """Mails waiting for a worker, not counting scheduled retries."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queue_depth": self.queue_depth,
+            "retry_depth": len(self._retries),
+            "pending": self.pending,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "connections_opened": self.connections_opened,
+        }
+
+    def _ensure_started(self):
+        # Workers are started lazily and per process, so forked web workers each get their own.
+        with self._lock:
+            if self._queue is not None and self._pid == os.getpid():
+                return self._queue
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._retries = []
+            self._pid = os.getpid()
+            self.pending = 0
+            for index in range(self.workers):
+                threading.Thread(target=self._work, name=f"mail-dispatcher-{index}", daemon=True).start()
+            atexit.register(self.flush, self.shutdown_timeout)
+            return self._queue
+
+    def enqueue(self, mail):
+        """Queues a Mail for delivery. Returns False when it was dropped because the queue stayed full."""
+        if not self.workers:
+            self._send_inline(mail)
+            return True
+
+        mail_queue = self._ensure_started()
+        with self._lock:
+            self.pending += 1
+        try:
+            mail_queue.put(mail, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self._finish(mail, dropped=1, error="Mail queue full")
+            logger.error("Mail queue full, dropped mail to %s: %s", mail.receiver_email, self.stats())
+            return False
+        return True
+
+    def flush(self, timeout=None):
+        """Waits until every queued mail was sent or given up on. Returns False on timeout."""
+        with self._done:
+            return self._done.wait_for(lambda: self.pending == 0, timeout=timeout)
+
+    def _finish(self, mail, sent=0, failed=0, dropped=0, error=None):
+        with self._done:
+            self.pending -= sent + failed + dropped
+            self.sent += sent
+            self.failed += failed
+            self.dropped += dropped
+            if self.pending == 0:
+                self._done.notify_all()
+        self._notify(mail, error)
+
+    @staticmethod
+    def _notify(mail, error):
+        if mail.on_done is None:
+            return
+        try:
+            mail.on_done(error)
+        except Exception:
+            logger.exception("Mail completion callback failed for %s", mail.receiver_email)
+
+    def _send_inline(self, mail):
+        with self._lock:
+            self.pending += 1
+        try:
+            mail.build().send()
+        except Exception as exc:
+            logger.exception("Sending mail to %s failed", mail.receiver_email)
+            self._finish(mail, failed=1, error=exc)
+        else:
+            self._finish(mail, sent=1)
+
+    def _next_batch(self, mail_queue):
+        """Due retries first, then queued mails; waits for the first mail at most until the next retry is due."""
+        now = time.monotonic()
+        batch = []
+        with self._lock:
+            while self._retries and self._retries[0][0] <= now and len(batch) < self.batch_size:
+                batch.append(heapq.heappop(self._retries)[2])
+            next_due = self._retries[0][0] - now if self._retries else None
+
+        try:
+            if not batch:
+                wait = self.idle_timeout if next_due is None else min(self.idle_timeout, next_due)
+                batch.append(mail_queue.get(timeout=max(wait, 0.01)))
+            while len(batch) < self.batch_size:
+                batch.append(mail_queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _open(self):
+        connection = get_connection(fail_silently=False)
+        connection.open()
+        with self._lock:
+            self.connections_opened += 1
+        return connection
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            logger.debug("Closing mail connection failed", exc_info=True)
+
+    def _retry(self, mail, error):
+        mail.attempts += 1
+        if mail.attempts > self.max_retries:
+            logger.error("Giving up on mail to %s after %s attempts", mail.receiver_email, mail.attempts)
+            self._finish(mail, failed=1, error=error)
+            return
+
+        due = time.monotonic() + self.retry_backoff * 2 ** (mail.attempts - 1)
+        with self._lock:
+            heapq.heappush(self._retries, (due, next(self._sequence), mail))
+            self.retried += 1
+
+    @staticmethod
+    def _render_batch(batch):
+        """Renders the batch one template at a time; mails of a failing group are rendered again one by one."""
+        groups = {}
+        for mail in batch:
+            groups.setdefault(mail.template_name, []).append(mail)
+
+        bodies = {}
+        for template_name, mails in groups.items():
+            try:
+                rendered = mail_templates.render_many(template_name, [mail.context for mail in mails])
+            except Exception:
+                continue
+            bodies.update(zip(map(id, mails), rendered))
+        return bodies
+
+    def _work(self):
+        mail_queue = self._queue
+        connection = None
+        last_sent = time.monotonic()
+
+        while True:
+            batch = self._next_batch(mail_queue)
+            if not batch:
+                if connection is not None and time.monotonic() - last_sent >= self.idle_timeout:
+                    self._close(connection)
+                    connection = None
+                continue
+
+            bodies = self._render_batch(batch)
+            for mail in batch:
+                try:
+                    message = mail.build(body=bodies.get(id(mail)))
+                except Exception as exc:
+                    # Rendering errors will not go away on retry.
+                    logger.exception("Rendering mail %s for %s failed", mail.template_name, mail.receiver_email)
+                    self._finish(mail, failed=1, error=exc)
+                    continue
+
+                try:
+                    if connection is None:
+                        connection = self._open()
+                    message.connection = connection
+                    message.send()
+                except Exception as exc:
+                    logger.warning("Sending mail to %s failed", mail.receiver_email, exc_info=True)
+                    # A rejected message leaves the SMTP session usable; anything else reconnects.
+                    if connection is not None and not isinstance(exc, smtplib.SMTPResponseException):
+                        self._close(connection)
+                        connection = None
+                    self._retry(mail, exc)
+                else:
+                    self._finish(mail, sent=1)
+            last_sent = time.monotonic()
+
+
+mail_dispatcher = MailDispatcher()
+
+
+class OutboxRelay:
+    """
+    Transactional outbox in front of the mail dispatcher.
+
+    `add` writes an extras_app.OutboxMail row in the caller's transaction and wakes the relay
+    once it commits. The relay thread (one per process, also woken every POLL_INTERVAL seconds)
+    leases due rows with a couple of queries and hands them to mail_dispatcher, keeping at most
+    BATCH_SIZE mails pending there so none waits in its queue past the lease (each delivery wakes
+    the relay to top it up); delivered rows are marked sent in bulk, failed ones come back after
+    RETRY_BACKOFF * 2 ** (attempt - 1) seconds until MAX_ATTEMPTS. Rows whose relay died are picked up again when their LEASE expires,
+    so delivery is at-least-once. Web processes start the relay when the application loads
+    (config.wsgi / config.asgi); with RELAY_IN_PROCESS = False only `manage.py drain_outbox` sends.
+    """
+
+    def __init__(self):
+        config = getattr(settings, "MAIL_OUTBOX", {})
+        self.enabled = config.get("ENABLED", True)
+        self.relay_in_process = config.get("RELAY_IN_PROCESS", True)
+        self.batch_size = config.get("BATCH_SIZE", 200)
+        self.poll_interval = config.get("POLL_INTERVAL", 5)
+        self.lease = config.get("LEASE", 600)
+        self.max_attempts = config.get("MAX_ATTEMPTS", 5)
+        self.retry_backoff = config.get("RETRY_BACKOFF", 60)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._sent = []
+        self._failures = {}
+
+    @property
+    def model(self):
+        # Resolved lazily: extras_app.models imports auth_app.models, which imports this module.
+        return apps.get_model("extras_app", "OutboxMail")
+
+    def add(self, subject, receiver_email, template_name, context):
+        if not self.enabled:
+            return mail_dispatcher.enqueue(Mail(subject, receiver_email, template_name, context))
+
+        row = self.model.objects.create(
+            subject=subject, receiver_email=receiver_email, template_name=template_name, context=context,
         )
-        email.content_subtype = "html"  
-        email.send()
+        transaction.on_commit(self.wake)
+        return row
+
+    def add_many(self, mails):
+        """Outbox rows for many (subject, receiver_email, template_name, context) tuples in one INSERT batch."""
+        if not self.enabled:
+            return [mail_dispatcher.enqueue(Mail(*mail)) for mail in mails]
+
+        rows = self.model.objects.bulk_create([
+            self.model(subject=subject, receiver_email=receiver_email, template_name=template_name, context=context)
+            for subject, receiver_email, template_name, context in mails
+        ], batch_size=self.batch_size)
+        if rows:
+            transaction.on_commit(self.wake)
+        return rows
+
+    def start(self):
+        """
+        Starts this process's relay thread and lets it drain what is already due, e.g. rows left
+        pending or with an expired lease by a restart. Called when the WSGI/ASGI application loads.
+        """
+        if not self.enabled or not self.relay_in_process:
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._sent, self._failures = [], {}
+                threading.Thread(target=self.run, name="mail-outbox-relay", daemon=True).start()
+                atexit.register(self.record_results)
+        self._wake.set()
+
+    def wake(self):
+        self.start()
+
+    def run(self, stop=None):
+        """Relay loop; `stop` is an optional threading.Event for dedicated relay processes."""
+        while stop is None or not stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                while self.relay_once() == self.batch_size:
+                    pass
+            except Exception:
+                logger.exception("Mail outbox relay failed")
+            finally:
+                close_old_connections()
+
+    def relay_once(self):
+        """Records finished deliveries, then tops the dispatcher up to BATCH_SIZE pending mails with due rows."""
+        self.record_results()
+        room = self.batch_size - mail_dispatcher.pending
+        if room <= 0:
+            return 0
+        rows = self.model.objects.claim(room, self.lease)
+        for row in rows:
+            mail = Mail(row.subject, row.receiver_email, row.template_name, row.context, on_done=partial(self._done, row.id))
+            mail_dispatcher.enqueue(mail)
+        return len(rows)
+
+    def _done(self, outbox_id, error):
+        with self._lock:
+            if error is None:
+                self._sent.append(outbox_id)
+            else:
+                self._failures[outbox_id] = error
+        self._wake.set()
+
+    def record_results(self):
+        with self._lock:
+            sent, self._sent = self._sent, []
+            failures, self._failures = self._failures, {}
+        if sent:
+            self.model.objects.mark_sent(sent)
+        if failures:
+            self.model.objects.reschedule(failures, self.max_attempts, self.retry_backoff)
+        return len(sent), len(failures)
+
+
+outbox_relay = OutboxRelay()
 
 
 def send_email(subject: str, receiver_email: str, template_name: str, context: dict):
-    EmailThread(subject, receiver_email, template_name, context).start()
+    return outbox_relay.add(subject, receiver_email, template_name, context)
 
 
 def send_new_user_welcome_email(user):
@@ -38,7 +405,7 @@ def send_new_user_welcome_email(user):
     }
     send_email(subject, receiver_email, template_name, context)
 
-def send_invitation_email(invitation):
+def invitation_mail(invitation):
     subject = "Invitation to join GenCD"
     receiver_email = invitation.to_email
     template_name = "email/invitation_org.html"
@@ -51,10 +418,19 @@ def send_invitation_email(invitation):
         "invitation_email": invitation.to_email,
         "join_url": join_url,
     }
-    send_email(subject, receiver_email, template_name, context)
+    return subject, receiver_email, template_name, context
+
+
+def send_invitation_email(invitation):
+    send_email(*invitation_mail(invitation))
+
+
+def send_invitation_emails(invitations):
+    """Queues the mails of many invitations with a single outbox insert."""
+    return outbox_relay.add_many([invitation_mail(invitation) for invitation in invitations])
+
     
-def send_password_reset_email(user, session_token):
-    subject = "Password Reset"
+def password_reset_mail(user, session_token, subject="Password Reset"):
     receiver_email = user.email
     full_name = user.full_name
     template_name = "email/password_reset.html"
@@ -67,4 +443,8 @@ def send_password_reset_email(user, session_token):
         "reset_url": reset_url,
         "full_name" : full_name
     }
-    send_email(subject, receiver_email, template_name, context)
\ No newline at end of file
+    return subject, receiver_email, template_name, context
+
+
+def send_password_reset_email(user, session_token):
+    send_email(*password_reset_mail(user, session_token))
@@ -0,0 +1,61 @@
+import logging
+from django.conf import settings
+from .invalidation import invalidation_bus
+from .queries import QueryCounter
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationMiddleware:
+    """
+    Applies cache invalidations published by other worker processes before each request,
+    so per-process role, principal and session caches never serve state older than the last commit.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        invalidation_bus.poll()
+        return self.get_response(request)
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the queries of each request and reports them in the X-Query-Count header.
+    Views declare `query_budget` (an int, or a {method: int} dict); requests over budget are
+    logged, or fail when settings.QUERY_BUDGET['RAISE'] is set (useful in tests and CI).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = getattr(settings, "QUERY_BUDGET", {})
+        self.enabled = config.get("ENABLED", True)
+        self.default_budget = config.get("DEFAULT")
+        self.raise_on_exceed = config.get("RAISE", False)
+
+    def get_budget(self, request):
+        match = getattr(request, "resolver_match", None)
+        view_class = (getattr(match.func, "cls", None) or getattr(match.func, "view_class", None)) if match else None
+        budget = getattr(view_class, "query_budget", self.default_budget)
+        if isinstance(budget, dict):
+            budget = budget.get(request.method, self.default_budget)
+        return budget
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        with QueryCounter() as queries:
+            response = self.get_response(request)
+
+        request.query_count = queries.count
+        response["X-Query-Count"] = str(queries.count)
+
+        budget = self.get_budget(request)
+        if budget is not None and queries.count > budget:
+            message = f"{request.method} {request.path} ran {queries.count} queries (budget {budget})"
+            if self.raise_on_exceed:
+                raise AssertionError(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,160 @@
+import json
+import base64
+import binascii
+from datetime import date, datetime
+from uuid import UUID
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Keyset (seek) pagination with opaque cursors.
+
+    Rows are ordered by one column plus the primary key as a tie-breaker, and each page is
+    fetched with `WHERE (col, pk) < (last_col, last_pk)` expanded into plain comparisons, so a
+    deep page costs the same index range scan as the first and rows inserted meanwhile never
+    shift or duplicate entries. The column is the first `?ordering=` field when the view's
+    OrderingFilter accepts it, otherwise the view's `keyset_ordering` (default newest first).
+    """
+
+    page_size = api_settings.PAGE_SIZE or 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    default_ordering = ('-created_at',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        model = queryset.model
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter) and request.query_params.get(backend.ordering_param):
+                requested = backend().get_ordering(request, queryset, view) or []
+                ordering = requested[:1]
+
+        if ordering:
+            try:
+                model._meta.get_field(ordering[0].lstrip('-'))
+            except FieldDoesNotExist:
+                ordering = None
+
+        ordering = list(ordering or getattr(view, 'keyset_ordering', self.default_ordering))
+        pk_name = model._meta.pk.name
+        if ordering[-1].lstrip('-') != pk_name:
+            ordering.append(f"{'-' if ordering[0].startswith('-') else ''}{pk_name}")
+        return ordering
+
+    def encode_cursor(self, row, reverse):
+        values = [_encode_value(getattr(row, name)) for name, _ in self.fields]
+        raw = json.dumps([int(reverse), values], separators=(',', ':')).encode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, base64.urlsafe_b64encode(raw).decode().rstrip('='))
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            reverse, values = json.loads(raw)
+            if len(values) != len(self.fields):
+                raise ValueError(encoded)
+            values = [model._meta.get_field(name).to_python(value) for (name, _), value in zip(self.fields, values)]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return bool(reverse), values
+
+    def keyset_filter(self, values, reverse):
+        """(a, b) after (va, vb) in the page direction: a > va OR (a = va AND b > vb)."""
+        condition, equal = Q(), Q()
+        for (name, descending), value in zip(self.fields, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = self.get_ordering(request, queryset, view)
+        self.fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = bool(cursor and cursor[0])
+        page_size = self.get_page_size(request)
+
+        # Cursor values are read from the rows, so they must not be deferred by only()/defer().
+        keys = {name for name, _ in self.fields}
+        loaded, deferred = queryset.query.deferred_loading
+        if loaded and not deferred:
+            queryset = queryset.only(*loaded, *keys)
+        elif loaded & keys:
+            queryset = queryset.defer(None).defer(*(loaded - keys))
+
+        if reverse:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self.keyset_filter(cursor[1], reverse))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not reverse else True
+        self.has_previous = cursor is not None if not reverse else has_more
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -1,23 +1,178 @@
 import json
+import time
+import hashlib
+import logging
+import threading
 from rest_framework.permissions import BasePermission
 from auth_app.models import Role
 from django.conf import settings
+from .exceptions import SmoothException
+
+logger = logging.getLogger(__name__)
 
 PERMISSIONS_FILE_PATH = settings.BASE_DIR / 'data' / 'permissions.json'
 
-with open(PERMISSIONS_FILE_PATH, 'r') as f:
-    all_permissions_list = json.load(f)
 
-PERMISSIONS_INDEX = {}
-for perm in all_permissions_list:
-    slug = perm["slug"]
-    method = perm["request_method"].upper()
-    PERMISSIONS_INDEX.setdefault(slug, {})[method] = perm
+class PermissionCatalog:
+    """
+    Immutable snapshot of the permission catalog: the list as loaded, a slug -> {method: permission}
+    index, and the pre-rendered JSON bytes with their ETag for the catalog endpoint.
+    """
+    __slots__ = ("permissions", "index", "json_bytes", "etag", "digest")
+
+    def __init__(self, raw):
+        self.permissions = json.loads(raw)
+        self.index = {}
+        for perm in self.permissions:
+            self.index.setdefault(perm["slug"], {})[perm["request_method"].upper()] = perm
+
+        self.json_bytes = json.dumps(self.permissions, separators=(",", ":"), ensure_ascii=False).encode()
+        self.digest = hashlib.sha256(raw).hexdigest()
+        self.etag = '"%s"' % self.digest[:32]
+
+
+class PermissionRegistry:
+    """
+    Hot-reloadable permission catalog.
+
+    At most once per CHECK_INTERVAL seconds `catalog()` stats the file; when its mtime or size
+    moved and the content hash differs, a new PermissionCatalog is built and swapped in with a
+    single assignment, so readers always see either the old or the new catalog, never a mix.
+    A file that fails to parse is logged and the previous catalog is kept.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.check_interval = getattr(settings, "PERMISSION_CATALOG", {}).get("CHECK_INTERVAL", 2)
+        self._lock = threading.Lock()
+        self._stat = None
+        self._checked_at = 0.0
+        self._catalog = None
+        self.reload()
+
+    def reload(self):
+        with self._lock:
+            stat = self.path.stat()
+            raw = self.path.read_bytes()
+            self._stat = (stat.st_mtime_ns, stat.st_size)
+            self._checked_at = time.monotonic()
+            if self._catalog is not None and hashlib.sha256(raw).hexdigest() == self._catalog.digest:
+                return self._catalog
+
+            try:
+                catalog = PermissionCatalog(raw)
+            except (ValueError, KeyError, TypeError, AttributeError):
+                if self._catalog is None:
+                    raise
+                logger.exception("Ignoring invalid permission catalog %s", self.path)
+                return self._catalog
+
+            self._catalog = catalog
+            return catalog
+
+    def catalog(self):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._checked_at = time.monotonic()
+            try:
+                stat = self.path.stat()
+                if (stat.st_mtime_ns, stat.st_size) != self._stat:
+                    return self.reload()
+            except OSError:
+                logger.exception("Permission catalog %s is not readable, keeping the loaded one", self.path)
+        return self._catalog
+
+
+permission_registry = PermissionRegistry(PERMISSIONS_FILE_PATH)
+
+
+def __getattr__(name):
+    # `all_permissions_list` and `PERMISSIONS_INDEX` used to be module constants; they now follow the registry.
+    if name == "all_permissions_list":
+        return permission_registry.catalog().permissions
+    if name == "PERMISSIONS_INDEX":
+        return permission_registry.catalog().index
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def permission_slugs(permissions):
+    """Slugs of a stored permission list. Tolerates the legacy format of full permission objects."""
+    return [p.get("slug") if isinstance(p, dict) else p for p in permissions or []]
+
+
+def normalize_permissions(permissions):
+    """
+    Validates permission input (slugs or full objects from the catalog) and returns
+    the compact form stored on Role.permissions: unique slugs, in input order.
+    """
+    if not isinstance(permissions, list):
+        raise SmoothException.error(
+            detail="Permissions must be a list of permission slugs.",
+            dev_message=f"Expected a list, got {type(permissions).__name__}",
+        )
+
+    slugs = list(dict.fromkeys(permission_slugs(permissions)))
+    index = permission_registry.catalog().index
+    unknown = [slug for slug in slugs if slug not in index]
+    if unknown:
+        raise SmoothException.error(
+            detail=f"Unknown permission(s): {', '.join(map(str, unknown))}",
+            dev_message=f"Slugs not present in {PERMISSIONS_FILE_PATH.name}: {unknown}",
+        )
+    return slugs
+
+
+def expand_permissions(permissions):
+    """Expands stored slugs into full catalog objects. Slugs no longer in the catalog are skipped."""
+    index = permission_registry.catalog().index
+    return [
+        perm
+        for slug in permission_slugs(permissions)
+        for perm in index.get(slug, {}).values()
+    ]
+
+
+class CompiledPermissions:
+    """
+    Immutable, pre-expanded view of a role's effective (own + inherited) permissions.
+    `grants` holds (slug, method) pairs resolved against the catalog it was compiled with.
+    """
+    __slots__ = ("slugs", "grants", "is_global", "catalog_digest")
+
+    def __init__(self, role: Role, catalog: PermissionCatalog):
+        self.slugs = frozenset(role.effective_permissions)
+        self.grants = frozenset(
+            (slug, method)
+            for slug in self.slugs
+            for method in catalog.index.get(slug, {})
+        )
+        self.catalog_digest = catalog.digest
+        self.is_global = bool(self.slugs) and (role.is_super_admin or "system.all" in self.slugs)
+
+    def allows(self, slug, method):
+        return self.is_global or (slug, method) in self.grants
+
+
+_compiled_permissions_cache = {}
+
+
+def compile_role_permissions(role: Role) -> CompiledPermissions:
+    """Returns the compiled permissions of a role, cached by role id, updated_at and catalog version."""
+    catalog = permission_registry.catalog()
+    if role.updated_at is None:
+        return CompiledPermissions(role, catalog)
+
+    cached = _compiled_permissions_cache.get(role.id)
+    if cached and cached[0] == role.updated_at and cached[1].catalog_digest == catalog.digest:
+        return cached[1]
+
+    compiled = CompiledPermissions(role, catalog)
+    _compiled_permissions_cache[role.id] = (role.updated_at, compiled)
+    return compiled
 
 
 class AppPermission(BasePermission):
     """
-    Optimized DRF permission class using Role.has_permission.
+    Optimized DRF permission class using the role's compiled permission set.
     Supports 'system.all' as global bypass for all request methods.
     """
 
@@ -29,22 +184,17 @@ class AppPermission(BasePermission):
         if not view_permission_slugs:
             return True  # no permissions required
 
+        if isinstance(view_permission_slugs, str):
+            view_permission_slugs = (view_permission_slugs,)
+
         current_method = request.method.upper()
         user_role : Role = getattr(request.user, "role", None)
 
-        if not user_role or not getattr(user_role, "permissions", []):
+        if not user_role:
             return False
 
-        if user_role.is_super_admin:
-            return True
-
-        for slug in view_permission_slugs:
-            if user_role.has_permission("system.all"):
-                return True
-
-            perm_for_method = PERMISSIONS_INDEX.get(slug, {}).get(current_method)
-
-            if perm_for_method and user_role.has_permission(slug):
-                return True
+        compiled = compile_role_permissions(user_role)
+        if not compiled.slugs:
+            return False
 
-        return False
+        return any(compiled.allows(slug, current_method) for slug in view_permission_slugs)
@@ -0,0 +1,31 @@
+from django.db import connections
+
+
+class QueryCounter:
+    """
+    Counts the SQL queries run on every database connection of the current thread.
+    Works without DEBUG, e.g. in tests: `with QueryCounter() as queries: ...; assert queries.count <= 3`.
+    """
+
+    def __init__(self, capture_sql=False):
+        self.capture_sql = capture_sql
+        self.count = 0
+        self.queries = []
+        self._wrappers = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        if self.capture_sql:
+            self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        for connection in connections.all():
+            wrapper = connection.execute_wrapper(self)
+            wrapper.__enter__()
+            self._wrappers.append(wrapper)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        while self._wrappers:
+            self._wrappers.pop().__exit__(exc_type, exc_value, traceback)
@@ -0,0 +1,161 @@
+import math
+import time
+import hashlib
+import threading
+from datetime import timedelta
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+from .cache import TTLCache
+from .invalidation import invalidation_bus
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. Never yields false negatives,
+    false positives occur at roughly `error_rate` once `capacity` items are added.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """
+    In-memory view of revoked sessions and users used by stateless token verification.
+
+    Revoked session keys live in a Bloom filter: a negative answer is final, a
+    positive one is confirmed against the TokenRevocation table and memoized.
+    User-level revocations (password change, deactivation) are few and kept exactly.
+    The process syncs new rows from the database every SYNC_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        config = getattr(settings, "STATELESS_AUTH", {})
+        self.sync_interval = config.get("REVOCATION_SYNC_INTERVAL", 5)
+        self.rebuild_interval = config.get("REVOCATION_REBUILD_INTERVAL", 3600)
+        self.capacity = config.get("BLOOM_CAPACITY", 100000)
+        self.error_rate = config.get("BLOOM_ERROR_RATE", 0.001)
+        self._lock = threading.Lock()
+        self._confirmed = TTLCache(max_entries=10000, ttl=self.rebuild_interval)
+        self._reset()
+
+    @property
+    def model(self):
+        return apps.get_model("auth_app", "TokenRevocation")
+
+    def _reset(self):
+        self.bloom = BloomFilter(self.capacity, self.error_rate)
+        self.revoked_users = {}
+        self.last_synced_at = None
+        self.last_sync = 0.0
+        self.last_rebuild = 0.0
+
+    def _apply(self, kind, value, revoked_at, keep_session=None, bloom=None, revoked_users=None):
+        bloom = self.bloom if bloom is None else bloom
+        revoked_users = self.revoked_users if revoked_users is None else revoked_users
+        if kind == self.model.SESSION:
+            bloom.add(value)
+            self._confirmed.set(value, True)
+        else:
+            current = revoked_users.get(value)
+            if current is None or current[0] <= revoked_at:
+                revoked_users[value] = (revoked_at, keep_session)
+
+    def _load(self, since=None, bloom=None, revoked_users=None):
+        """Applies unexpired rows (revoked from `since` on) and returns the latest revoked_at seen."""
+        latest = since
+        rows = self.model.objects.filter(expires_at__gt=timezone.now())
+        if since:
+            # Overlap the window so rows committed out of order are not missed.
+            rows = rows.filter(revoked_at__gte=since - timedelta(seconds=self.sync_interval * 2))
+
+        for kind, value, revoked_at, keep_session in rows.values_list("kind", "value", "revoked_at", "keep_session"):
+            self._apply(kind, value, revoked_at.timestamp(), keep_session, bloom, revoked_users)
+            if latest is None or revoked_at > latest:
+                latest = revoked_at
+        return latest
+
+    def sync(self, force=False):
+        now = time.time()
+        if not force and now - self.last_sync < self.sync_interval:
+            return
+
+        with self._lock:
+            if not force and now - self.last_sync < self.sync_interval:
+                return
+
+            if now - self.last_rebuild >= self.rebuild_interval:
+                # Rebuilt aside and swapped in whole: readers keep the current filter until the reload
+                # has finished, and keep it if the reload fails. Expired rows are purged by
+                # `manage.py purge_sessions`, not on the request path.
+                bloom, revoked_users = BloomFilter(self.capacity, self.error_rate), {}
+                last_synced_at = self._load(bloom=bloom, revoked_users=revoked_users)
+                self.bloom, self.revoked_users, self.last_synced_at = bloom, revoked_users, last_synced_at
+                self.last_rebuild = now
+            else:
+                self.last_synced_at = self._load(since=self.last_synced_at)
+
+            self.last_sync = now
+
+    def is_revoked(self, payload):
+        """Checks a decoded token payload against session and user revocations."""
+        self.sync()
+
+        session_key = payload.get("session_key")
+        if session_key and session_key in self.bloom:
+            confirmed = self._confirmed.get(session_key)
+            if confirmed is None:
+                confirmed = self.model.objects.filter(kind=self.model.SESSION, value=session_key).exists()
+                self._confirmed.set(session_key, confirmed)
+            if confirmed:
+                return True
+
+        user_revocation = self.revoked_users.get(str(payload.get("user_id")))
+        if user_revocation:
+            revoked_at, keep_session = user_revocation
+            # iat carries sub-second precision (helper.utils.encode_token); whole-second iats of older
+            # tokens round down, so a token minted in the revocation second is revoked too.
+            if payload.get("iat", 0) < revoked_at and session_key != keep_session:
+                return True
+
+        return False
+
+    def revoke_session(self, session_key):
+        self._revoke(self.model.SESSION, session_key)
+
+    def revoke_user(self, user_id, keep_session=None):
+        """Revokes every token of the user issued before now, except `keep_session`."""
+        self._revoke(self.model.USER, str(user_id), keep_session)
+
+    def _revoke(self, kind, value, keep_session=None):
+        lifetime = settings.SIMPLE_JWT.get("ACCESS_TOKEN_LIFETIME", timedelta(days=2))
+        revocation = self.model.objects.create(
+            kind=kind,
+            value=value,
+            keep_session=keep_session,
+            expires_at=timezone.now() + lifetime,
+        )
+        with self._lock:
+            self._apply(kind, value, revocation.revoked_at.timestamp(), keep_session)
+
+        # Other workers sync right away instead of waiting for SYNC_INTERVAL.
+        invalidation_bus.publish("revocation", kind)
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,281 @@
+from operator import attrgetter
+from django.db import models
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import api_settings
+
+
+def _split(value):
+    return [part.strip() for part in (value or '').split(',') if part.strip()]
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets and relation expansion for ModelSerializers.
+
+    `?fields=id,email,role.name` keeps only the listed fields (dotted names select fields of an
+    expanded relation). `?expand=role` renders the relations in `expandable_fields` with their
+    nested serializer; the ones not expanded are rendered as primary keys. Without `?expand=`,
+    `default_expand` applies. Query parameters are read only when the serializer is built for
+    output (no `data`) with a request in its context; nested serializers receive `fields` directly.
+    `prune_queryset` then limits select_related / prefetch_related / only() to what will be rendered.
+    """
+
+    # name -> (serializer class, kwargs); the serializer should use this mixin to support dotted fields.
+    expandable_fields = {}
+    default_expand = ()
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = kwargs.get('context', {}).get('request')
+        if request is not None and 'data' not in kwargs and fields is None and expand is None:
+            params = getattr(request, 'query_params', request.GET)
+            fields = _split(params.get('fields')) or None
+            expand = _split(params['expand']) if 'expand' in params else None
+        self.apply_field_selection(fields, expand)
+
+    def apply_field_selection(self, fields, expand):
+        expand = set(self.default_expand if expand is None else expand)
+        selected, nested = None, {}
+        if fields is not None:
+            selected = set()
+            for name in fields:
+                head, _, rest = name.partition('.')
+                selected.add(head)
+                if rest:
+                    nested.setdefault(head, []).append(rest)
+
+        for name, (serializer_class, options) in self.expandable_fields.items():
+            if name not in self.fields or (selected is not None and name not in selected):
+                continue
+            if name in expand or name in nested:
+                nested_kwargs = {'fields': nested[name]} if name in nested and issubclass(serializer_class, DynamicFieldsMixin) else {}
+                self.fields[name] = serializer_class(read_only=True, **options, **nested_kwargs)
+            else:
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, many=options.get('many', False))
+
+        if selected is not None:
+            for name in set(self.fields) - selected:
+                self.fields.pop(name)
+
+    def get_only_fields(self):
+        """Model columns the selected fields read, or None when a field needs the whole row."""
+        model = self.Meta.model
+        columns = {model._meta.pk.name}
+        for field in self.fields.values():
+            if field.write_only:
+                continue
+            head = field.source.split('.')[0]
+            try:
+                model_field = model._meta.get_field(head)
+            except FieldDoesNotExist:
+                return None  # '*' sources, properties and methods
+            if model_field.many_to_many or model_field.one_to_many:
+                continue
+
+            columns.add(head)
+            nested = getattr(field, 'child', field)
+            if isinstance(nested, DynamicFieldsMixin) and model_field.is_relation:
+                nested_columns = nested.get_only_fields()
+                if nested_columns is not None:
+                    columns |= {f'{head}__{column}' for column in nested_columns}
+        return columns
+
+    def get_related_lookups(self):
+        """(select_related, prefetch_related) lookups needed by the rendered fields."""
+        model = self.Meta.model
+        related, prefetch = [], []
+        for field in self.fields.values():
+            if field.write_only:
+                continue
+            head = field.source.split('.')[0]
+            try:
+                model_field = model._meta.get_field(head)
+            except FieldDoesNotExist:
+                continue
+            if not model_field.is_relation:
+                continue
+
+            nested = getattr(field, 'child', field)
+            to_many = model_field.many_to_many or model_field.one_to_many
+            if isinstance(nested, DynamicFieldsMixin):
+                (prefetch if to_many else related).append(head)
+                nested_related, nested_prefetch = nested.get_related_lookups()
+                prefix_list = prefetch if to_many else related
+                prefix_list.extend(f'{head}__{lookup}' for lookup in nested_related)
+                prefetch.extend(f'{head}__{lookup}' for lookup in nested_prefetch)
+            elif to_many:
+                prefetch.append(head)
+        return related, prefetch
+
+    def prune_queryset(self, queryset):
+        """Restricts eager loading and fetched columns to the fields this serializer will render."""
+        related, prefetch = self.get_related_lookups()
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+
+        columns = self.get_only_fields()
+        if columns is not None:
+            queryset = queryset.only(*columns)
+        return queryset
+
+
+# Field classes whose `to_representation` is a plain type conversion of a non-null value.
+_CONVERTERS = {
+    serializers.CharField: str,
+    serializers.EmailField: str,
+    serializers.SlugField: str,
+    serializers.URLField: str,
+    serializers.IPAddressField: str,
+    serializers.BooleanField: bool,
+    serializers.IntegerField: int,
+    serializers.FloatField: float,
+    serializers.JSONField: None,
+    serializers.ReadOnlyField: None,
+}
+
+_SKIP = object()
+
+
+def _generic_reader(field):
+    """The exact steps of `Serializer.to_representation` for one field."""
+    def read(instance):
+        try:
+            attribute = field.get_attribute(instance)
+        except SkipField:
+            return _SKIP
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        return None if check_for_none is None else field.to_representation(attribute)
+    read.may_skip = True
+    return read
+
+
+def _column_reader(name, convert):
+    if convert is None:
+        return attrgetter(name)
+
+    def read(instance):
+        value = getattr(instance, name)
+        return None if value is None else convert(value)
+    return read
+
+
+def _datetime_reader(field, name):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return None
+
+    to_representation = field.to_representation
+
+    def read(instance):
+        value = getattr(instance, name)
+        if not value:
+            return None
+        if isinstance(value, str) or value.tzinfo is None:
+            return to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return read
+
+
+def _field_reader(field, model):
+    """Picks a specialised reader for `field`, or the generic DRF path when none applies."""
+    if field.source == '*' or len(field.source_attrs) != 1:
+        return _generic_reader(field)
+
+    name = field.source_attrs[0]
+    try:
+        model_field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return _generic_reader(field)
+    if not model_field.concrete and not model_field.many_to_many:
+        return _generic_reader(field)
+
+    field_class = type(field)
+    if not model_field.is_relation:
+        if field_class in _CONVERTERS:
+            return _column_reader(name, _CONVERTERS[field_class])
+        if field_class is serializers.UUIDField and field.uuid_format == 'hex_verbose':
+            return _column_reader(name, str)
+        if field_class is serializers.DateTimeField:
+            return _datetime_reader(field, name) or _generic_reader(field)
+        return _generic_reader(field)
+
+    if field_class is serializers.PrimaryKeyRelatedField and field.pk_field is None and not model_field.many_to_many:
+        return attrgetter(model_field.attname)
+
+    if (field_class is serializers.ManyRelatedField and type(field.child_relation) is serializers.PrimaryKeyRelatedField
+            and field.child_relation.pk_field is None):
+        def read_pks(instance):
+            if instance.pk is None:
+                return []
+            # Prefetched rows are read straight from the cache instead of building a related manager per row.
+            prefetched = getattr(instance, '_prefetched_objects_cache', {}).get(name)
+            related = getattr(instance, name).all() if prefetched is None else prefetched
+            return [item.pk for item in related]
+        return read_pks
+
+    if _is_compilable(field) and not model_field.many_to_many:
+        nested = compile_read_serializer(field)
+
+        def read_nested(instance):
+            value = getattr(instance, name)
+            return None if value is None else nested(value)
+        return read_nested
+
+    return _generic_reader(field)
+
+
+def _is_compilable(serializer):
+    """ModelSerializers that keep DRF's field-by-field `to_representation`."""
+    return (
+        isinstance(serializer, serializers.ModelSerializer)
+        and type(serializer).to_representation is serializers.Serializer.to_representation
+    )
+
+
+def compile_read_serializer(serializer):
+    """
+    Builds an `instance -> dict` function equivalent to `serializer.to_representation`.
+
+    Each readable field is resolved once to a specialised reader (column access plus the type
+    conversion DRF would apply, nested ModelSerializers compiled recursively); fields it cannot
+    prove equivalent, such as method fields or dotted sources, fall back to DRF's own steps.
+    The field set is taken after `DynamicFieldsMixin` selection, so sparse fieldsets compile too.
+    """
+    readers = [(field.field_name, _field_reader(field, serializer.Meta.model)) for field in serializer._readable_fields]
+
+    if not any(getattr(read, 'may_skip', False) for _, read in readers):
+        def to_representation(instance):
+            return {name: read(instance) for name, read in readers}
+        return to_representation
+
+    def to_representation_with_skips(instance):
+        ret = {}
+        for name, read in readers:
+            value = read(instance)
+            if value is not _SKIP:
+                ret[name] = value
+        return ret
+    return to_representation_with_skips
+
+
+class CompiledListSerializer(serializers.ListSerializer):
+    """
+    Opt-in list serializer (`Meta.list_serializer_class`) rendering rows through
+    `compile_read_serializer`; the output is identical to the child serializer's.
+    """
+
+    def to_representation(self, data):
+        if not _is_compilable(self.child):
+            return super().to_representation(data)
+
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        to_representation = compile_read_serializer(self.child)
+        return [to_representation(item) for item in iterable]
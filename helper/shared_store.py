@@ -0,0 +1,63 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+
+
+class SharedStore:
+    """
+    Small SQLite database shared by every worker process on the host.
+
+    Used for state that must be consistent across gunicorn workers but does not
+    belong in the main database (throttle counters and the like). Each thread keeps
+    its own connection, reopened when SHARED_STORE_PATH changes (tests point it at a
+    private file); write sections run under BEGIN IMMEDIATE so read-modify-write
+    sequences are atomic across processes.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._schemas = []
+        self._local = threading.local()
+
+    @property
+    def path(self):
+        return self._path or str(getattr(settings, "SHARED_STORE_PATH"))
+
+    def register_schema(self, ddl):
+        """Registers DDL (CREATE ... IF NOT EXISTS) applied to every new connection."""
+        if ddl not in self._schemas:
+            self._schemas.append(ddl)
+        if getattr(self._local, "connection", None) is not None:
+            self._local.connection.executescript(ddl)
+
+    def connection(self):
+        connection = getattr(self._local, "connection", None)
+        path = self.path
+        if connection is None or self._local.pid != os.getpid() or self._local.path != path:
+            if connection is not None and self._local.pid == os.getpid():
+                connection.close()
+            connection = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            for ddl in self._schemas:
+                connection.executescript(ddl)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+            self._local.path = path
+        return connection
+
+    @contextmanager
+    def transaction(self):
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+
+shared_store = SharedStore()
@@ -0,0 +1,114 @@
+import json
+import hashlib
+import threading
+from pathlib import Path
+import jwt
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from django.conf import settings
+
+
+class SigningKey:
+    """One asymmetric key pair identified by `kid`; retired keys have no private half."""
+
+    def __init__(self, kid, public_key, private_key=None):
+        self.kid = kid
+        self.public_key = public_key
+        self.private_key = private_key
+        if isinstance(public_key, ed25519.Ed25519PublicKey):
+            self.algorithm = "EdDSA"
+            self._jwk_algorithm = OKPAlgorithm
+        elif isinstance(public_key, rsa.RSAPublicKey):
+            self.algorithm = "RS256"
+            self._jwk_algorithm = RSAAlgorithm
+        else:
+            raise ValueError(f"Unsupported JWT key type for kid '{kid}'.")
+
+    def to_jwk(self):
+        jwk = self._jwk_algorithm.to_jwk(self.public_key, as_dict=True)
+        jwk.update({"kid": self.kid, "alg": self.algorithm, "use": "sig"})
+        return jwk
+
+
+class KeyRing:
+    """
+    JWT signing keys loaded from settings.JWT_SIGNING.
+
+    KEYS_DIR holds `<kid>.public.pem` files (and `<kid>.private.pem` for keys that can still sign).
+    Tokens are signed with ACTIVE_KID and carry it in their `kid` header; every public key in the
+    directory is accepted for verification and published in the JWKS document, so keys can be
+    rotated by adding a new pair, switching ACTIVE_KID, and deleting the old pair once its tokens expire.
+    Without an ACTIVE_KID tokens are signed with HS256 and SECRET_KEY, as before.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self):
+        config = getattr(settings, "JWT_SIGNING", {})
+        self.active_kid = config.get("ACTIVE_KID")
+        self.accept_legacy_hs256 = config.get("ACCEPT_LEGACY_HS256", True)
+        self.jwks_max_age = config.get("JWKS_MAX_AGE", 3600)
+        self.keys = {}
+
+        keys_dir = config.get("KEYS_DIR")
+        if keys_dir and Path(keys_dir).is_dir():
+            for public_path in sorted(Path(keys_dir).glob("*.public.pem")):
+                kid = public_path.name[:-len(".public.pem")]
+                public_key = serialization.load_pem_public_key(public_path.read_bytes())
+                private_path = public_path.with_name(f"{kid}.private.pem")
+                private_key = None
+                if private_path.exists():
+                    private_key = serialization.load_pem_private_key(private_path.read_bytes(), password=None)
+                self.keys[kid] = SigningKey(kid, public_key, private_key)
+
+        if self.active_kid and (self.active_kid not in self.keys or not self.keys[self.active_kid].private_key):
+            raise ValueError(f"JWT_SIGNING ACTIVE_KID '{self.active_kid}' has no private key in {keys_dir}.")
+
+        jwks = {"keys": [key.to_jwk() for key in self.keys.values()]}
+        self.jwks_json = json.dumps(jwks, separators=(",", ":")).encode()
+        self.jwks_etag = '"%s"' % hashlib.sha256(self.jwks_json).hexdigest()[:32]
+        self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+
+    def reload(self):
+        with self._lock:
+            self._load()
+
+    def encode(self, payload):
+        self._ensure_loaded()
+        if not self.active_kid:
+            return jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
+
+        key = self.keys[self.active_kid]
+        return jwt.encode(payload, key.private_key, algorithm=key.algorithm, headers={"kid": key.kid})
+
+    def decode(self, token):
+        """Verifies a token against the key named in its header. Raises jwt.InvalidTokenError subclasses."""
+        self._ensure_loaded()
+        kid = jwt.get_unverified_header(token).get("kid")
+
+        if kid is None:
+            if self.active_kid and not self.accept_legacy_hs256:
+                raise jwt.InvalidTokenError("Token has no key id.")
+            return jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+
+        key = self.keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown signing key '{kid}'.")
+        return jwt.decode(token, key.public_key, algorithms=[key.algorithm])
+
+    def jwks(self):
+        """Pre-rendered JWKS document bytes and their ETag."""
+        self._ensure_loaded()
+        return self.jwks_json, self.jwks_etag
+
+
+key_ring = KeyRing()
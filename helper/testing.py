@@ -0,0 +1,12 @@
+import os
+import atexit
+import shutil
+import tempfile
+from django.test import override_settings
+
+_shared_store_dir = tempfile.mkdtemp(prefix="gencd-tests-")
+atexit.register(shutil.rmtree, _shared_store_dir, ignore_errors=True)
+
+# Test classes decorated with this use a shared store private to the test run, never the
+# host-wide file a running server keeps its throttles, lockouts and invalidations in.
+isolated_shared_store = override_settings(SHARED_STORE_PATH=os.path.join(_shared_store_dir, "shared_store.sqlite3"))
@@ -0,0 +1,361 @@
+import os
+import time
+import logging
+import smtplib
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from auth_app.models import User, Role, AuthSession, TokenRevocation
+from extras_app.models import Log
+from extras_app.serializers import LogSerializer
+from helper.hashing import PasswordHashingService
+from helper.invalidation import InvalidationBus
+from helper.mails import Mail, MailDispatcher
+from helper.revocation import RevocationList
+from helper.serializers import compile_read_serializer
+from helper.shared_store import shared_store
+from helper.testing import isolated_shared_store
+from helper.utils import create_session, encode_token, decode_token, revoke_user_sessions
+from users_app.serializers import UserSerializer, AuthSessionSerializer
+
+
+@isolated_shared_store
+class RevocationListTests(TestCase):
+
+    def setUp(self):
+        self.revocations = RevocationList()
+
+    def test_revoked_session_stays_revoked_while_rebuilding(self):
+        self.revocations.revoke_session("s1")
+        self.revocations.sync(force=True)
+        bloom = self.revocations.bloom
+        seen_during_reload = []
+
+        def load(*args, **kwargs):
+            seen_during_reload.append(self.revocations.is_revoked({"session_key": "s1"}))
+            return original_load(*args, **kwargs)
+
+        original_load = self.revocations._load
+        self.revocations.last_rebuild = 0.0
+        with mock.patch.object(self.revocations, "_load", side_effect=load):
+            self.revocations.sync(force=True)
+
+        self.assertEqual(seen_during_reload, [True])
+        self.assertIsNot(self.revocations.bloom, bloom)
+        self.assertTrue(self.revocations.is_revoked({"session_key": "s1"}))
+
+    def test_failed_rebuild_keeps_current_revocations(self):
+        self.revocations.revoke_session("s1")
+        self.revocations.revoke_user("u1")
+        self.revocations.sync(force=True)
+        self.revocations.last_rebuild = 0.0
+
+        with mock.patch.object(self.revocations, "_load", side_effect=RuntimeError("database is locked")):
+            with self.assertRaises(RuntimeError):
+                self.revocations.sync(force=True)
+
+        self.assertTrue(self.revocations.is_revoked({"session_key": "s1"}))
+        self.assertTrue(self.revocations.is_revoked({"session_key": "s2", "user_id": "u1", "iat": 0}))
+
+    def test_rebuild_does_not_delete_rows(self):
+        TokenRevocation.objects.create(kind=TokenRevocation.SESSION, value="old", expires_at=timezone.now())
+        self.revocations.last_rebuild = 0.0
+        self.revocations.sync(force=True)
+        self.assertTrue(TokenRevocation.objects.filter(value="old").exists())
+
+    def test_token_minted_in_revocation_second_is_revoked(self):
+        self.revocations.revoke_user("u1")
+        revoked_at = TokenRevocation.objects.get(value="u1").revoked_at.timestamp()
+
+        self.assertTrue(self.revocations.is_revoked({"session_key": "s1", "user_id": "u1", "iat": int(revoked_at)}))
+        self.assertTrue(self.revocations.is_revoked({"session_key": "s1", "user_id": "u1", "iat": revoked_at - 0.001}))
+
+    def test_token_minted_after_revocation_is_accepted(self):
+        self.revocations.revoke_user("u1")
+        payload = decode_token(encode_token({"session_key": "s2", "user_id": "u1"}))
+        self.assertFalse(self.revocations.is_revoked(payload))
+
+    def test_kept_session_survives_user_revocation(self):
+        iat = time.time()
+        self.revocations.revoke_user("u1", keep_session="s1")
+        self.assertFalse(self.revocations.is_revoked({"session_key": "s1", "user_id": "u1", "iat": iat}))
+        self.assertTrue(self.revocations.is_revoked({"session_key": "s2", "user_id": "u1", "iat": iat}))
+
+
+@isolated_shared_store
+class TokenRevocationPurgeTests(TestCase):
+
+    def test_purge_expired_keeps_live_rows(self):
+        now = timezone.now()
+        TokenRevocation.objects.create(kind=TokenRevocation.SESSION, value="expired", expires_at=now - timedelta(seconds=1))
+        TokenRevocation.objects.create(kind=TokenRevocation.SESSION, value="live", expires_at=now + timedelta(days=1))
+
+        self.assertEqual(TokenRevocation.objects.purge_expired(batch_size=1), 1)
+        self.assertEqual(list(TokenRevocation.objects.values_list("value", flat=True)), ["live"])
+
+
+@isolated_shared_store
+class SharedStoreTests(TestCase):
+
+    def test_connection_follows_the_configured_path(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "store.sqlite3")
+            with override_settings(SHARED_STORE_PATH=path):
+                shared_store.connection().execute("CREATE TABLE marker (id INTEGER)")
+                self.assertTrue(os.path.exists(path))
+            self.assertNotEqual(shared_store.connection().execute("PRAGMA database_list").fetchone()[2], path)
+
+
+@isolated_shared_store
+class InvalidationBusTests(TestCase):
+
+    def setUp(self):
+        connection = shared_store.connection()
+        connection.execute("DELETE FROM invalidation_pollers")
+        connection.execute("DELETE FROM invalidation_versions")
+        self.publisher = InvalidationBus()
+        self.publisher.prune_probability = 0
+        self.worker = InvalidationBus()
+        self.received, self.resets = [], []
+        self.worker.subscribe("session", self.received.append)
+        self.worker.subscribe_reset(lambda: self.resets.append(True))
+        self.worker.poll()
+
+    def current_seq(self):
+        return shared_store.connection().execute("SELECT seq FROM invalidation_sequence WHERE id = 1").fetchone()[0]
+
+    def register_poller(self, pid, seq, polled_at=None):
+        shared_store.connection().execute(
+            "INSERT OR REPLACE INTO invalidation_pollers (pid, seq, polled_at) VALUES (?, ?, ?)",
+            (pid, seq, time.time() if polled_at is None else polled_at),
+        )
+
+    def test_poll_delivers_keys_published_by_another_process(self):
+        self.publisher.publish_many("session", ["a", "b"])
+        self.worker.poll()
+        self.assertEqual(sorted(self.received), ["a", "b"])
+
+    def test_revoking_user_sessions_is_one_publish(self):
+        role = Role.objects.create(name="Member")
+        user = User.objects.create(email="member@example.com", role=role, profile_picture="images/profile_pictures/test.png")
+        for _ in range(3):
+            create_session({"user_id": str(user.id)})
+
+        before = self.current_seq()
+        self.assertEqual(len(revoke_user_sessions(user.id)), 3)
+        # One for the sessions, one for the stateless revocation.
+        self.assertEqual(self.current_seq() - before, 2)
+
+    def test_prune_keeps_rows_a_live_process_has_not_applied(self):
+        self.publisher.publish("session", "old")
+        self.register_poller(999999, self.current_seq())
+        self.publisher.publish("session", "new")
+        self.worker.poll()
+
+        self.publisher.prune()
+
+        keys = [row[0] for row in shared_store.connection().execute("SELECT key FROM invalidation_versions")]
+        self.assertEqual(keys, ["new"])
+
+    def test_prune_ignores_idle_processes(self):
+        self.register_poller(999999, 0, polled_at=time.time() - self.publisher.poller_ttl - 1)
+        self.publisher.publish_many("session", ["a", "b"])
+        self.worker.poll()
+
+        self.assertEqual(self.publisher.prune(), 2)
+        self.assertEqual(shared_store.connection().execute("SELECT COUNT(*) FROM invalidation_pollers").fetchone()[0], 1)
+
+    def test_process_behind_the_pruned_horizon_resets_its_caches(self):
+        lagging = InvalidationBus()
+        lagging.subscribe("session", self.received.append)
+        lagging.subscribe_reset(lambda: self.resets.append(True))
+        lagging._seen_seq = self.current_seq()
+
+        self.publisher.publish("session", "missed")
+        self.worker.poll()
+        shared_store.connection().execute("DELETE FROM invalidation_pollers WHERE pid != ?", (os.getpid(),))
+        self.publisher.prune()
+        lagging.poll()
+
+        self.assertEqual(self.resets, [True])
+        self.assertEqual(self.received, ["missed"])
+
+
+@isolated_shared_store
+class CompiledSerializerTests(TestCase):
+
+    def setUp(self):
+        parent = Role.objects.create(name="Parent", permissions=["user.list"])
+        self.role = Role.objects.create(name="Child")
+        self.role.parents.set([parent])
+        self.user = User.objects.create(
+            email="member@example.com", role=self.role, profile_picture="images/profile_pictures/test.png",
+            last_login=timezone.now(),
+        )
+        User.objects.create(email="new@example.com", role=parent, profile_picture="images/profile_pictures/test.png")
+        log = {"endpoint": "/api/", "http_method": "GET", "status_code": 200, "latency": 0.1, "ip_address": "10.0.0.1", "service": "api"}
+        Log.objects.create(user=self.user, request_payload={"a": [1, 2]}, **log)
+        Log.objects.create(user=None, **log)
+        create_session({"user_id": str(self.user.id), "ip_address": "10.0.0.1"})
+
+    def assertCompiledMatches(self, serializer, queryset):
+        compiled = compile_read_serializer(serializer)
+        for instance in queryset:
+            with self.subTest(instance=instance.pk):
+                self.assertEqual(compiled(instance), serializer.to_representation(instance))
+
+    def test_matches_drf_for_null_foreign_keys(self):
+        self.assertCompiledMatches(LogSerializer(), Log.objects.all())
+        self.assertCompiledMatches(LogSerializer(fields=["id", "user", "timestamp"]), Log.objects.all())
+
+    def test_matches_drf_for_nested_relations_and_datetimes(self):
+        for time_zone in ("UTC", "America/New_York"):
+            with self.subTest(time_zone=time_zone), override_settings(TIME_ZONE=time_zone):
+                self.assertCompiledMatches(UserSerializer(), User.objects.all())
+                self.assertCompiledMatches(UserSerializer(expand=[]), User.objects.all())
+
+    def test_matches_drf_for_method_fields(self):
+        self.assertCompiledMatches(AuthSessionSerializer(context={"request": None}), AuthSession.objects.all())
+
+    def test_list_serializer_output_is_unchanged(self):
+        queryset = User.objects.order_by("email")
+        compiled = UserSerializer(queryset, many=True).data
+        self.assertEqual(compiled, [UserSerializer().to_representation(user) for user in queryset])
+
+
+class PasswordHashingServiceTests(TestCase):
+
+    @override_settings(PASSWORD_HASHING_POOL={"WORKERS": 1, "MAX_PENDING": 1, "ACQUIRE_TIMEOUT": 0.1})
+    def test_failed_submit_frees_its_slot_without_counting_a_completion(self):
+        service = PasswordHashingService()
+        with mock.patch.object(service, "_get_executor") as executor:
+            executor.return_value.submit.side_effect = RuntimeError("cannot schedule new futures after shutdown")
+            with self.assertRaises(RuntimeError):
+                service.submit(len, "x")
+
+        self.assertEqual((service.pending, service.completed), (0, 0))
+        self.assertEqual(service.submit(len, "abc").result(timeout=5), 3)
+
+
+class FlakyEmailBackend(locmem.EmailBackend):
+    """Local SMTP stand-in: records opened connections and raises the queued errors on send."""
+
+    opened = 0
+    errors = []
+    gate = None
+
+    def open(self):
+        type(self).opened += 1
+        return True
+
+    def send_messages(self, messages):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.errors:
+            raise self.errors.pop(0)
+        return super().send_messages(messages)
+
+
+@isolated_shared_store
+@override_settings(EMAIL_BACKEND="helper.tests.FlakyEmailBackend")
+class MailDispatcherTests(TestCase):
+
+    def setUp(self):
+        self.templates = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.templates.name, "email"))
+        with open(os.path.join(self.templates.name, "email", "test.html"), "w") as template:
+            template.write("Hello {{ name }}")
+        templates_override = override_settings(TEMPLATES=[{
+            "BACKEND": "django.template.backends.django.DjangoTemplates",
+            "DIRS": [self.templates.name],
+        }])
+        templates_override.enable()
+        self.addCleanup(templates_override.disable)
+        self.addCleanup(self.templates.cleanup)
+
+        self.enterContext(mock.patch.object(logging.getLogger("helper.mails"), "disabled", True))
+        mail.outbox = []
+        FlakyEmailBackend.opened = 0
+        FlakyEmailBackend.errors = []
+        FlakyEmailBackend.gate = None
+
+    def dispatcher(self, **config):
+        config = {"WORKERS": 1, "BATCH_SIZE": 50, "MAX_RETRIES": 2, "RETRY_BACKOFF": 0.01, "IDLE_TIMEOUT": 1, **config}
+        with override_settings(MAIL_DISPATCHER=config):
+            return MailDispatcher()
+
+    def make_mail(self, index=0, on_done=None):
+        return Mail("Subject", f"user{index}@example.com", "email/test.html", {"name": f"user {index}"}, on_done=on_done)
+
+    def test_batch_is_sent_over_one_connection(self):
+        dispatcher = self.dispatcher()
+        for index in range(20):
+            dispatcher.enqueue(self.make_mail(index))
+
+        self.assertTrue(dispatcher.flush(5))
+        self.assertEqual(dispatcher.stats()["sent"], 20)
+        self.assertEqual(FlakyEmailBackend.opened, 1)
+        self.assertEqual(sorted(message.body for message in mail.outbox), sorted(f"Hello user {i}" for i in range(20)))
+
+    def test_disconnect_reconnects_and_retries(self):
+        FlakyEmailBackend.errors = [smtplib.SMTPServerDisconnected("Connection unexpectedly closed")]
+        dispatcher = self.dispatcher()
+        dispatcher.enqueue(self.make_mail())
+
+        self.assertTrue(dispatcher.flush(5))
+        stats = dispatcher.stats()
+        self.assertEqual((stats["sent"], stats["retried"], stats["failed"]), (1, 1, 0))
+        self.assertEqual(FlakyEmailBackend.opened, 2)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_rejected_message_keeps_the_connection(self):
+        FlakyEmailBackend.errors = [smtplib.SMTPDataError(451, b"Try again later")]
+        dispatcher = self.dispatcher()
+        dispatcher.enqueue(self.make_mail())
+
+        self.assertTrue(dispatcher.flush(5))
+        self.assertEqual(dispatcher.stats()["sent"], 1)
+        self.assertEqual(FlakyEmailBackend.opened, 1)
+
+    def test_gives_up_after_max_retries(self):
+        FlakyEmailBackend.errors = [smtplib.SMTPServerDisconnected("down")] * 3
+        results = []
+        dispatcher = self.dispatcher(MAX_RETRIES=2)
+        started = time.monotonic()
+        dispatcher.enqueue(self.make_mail(on_done=results.append))
+
+        self.assertTrue(dispatcher.flush(5))
+        stats = dispatcher.stats()
+        self.assertEqual((stats["sent"], stats["retried"], stats["failed"]), (0, 2, 1))
+        self.assertIsInstance(results[0], smtplib.SMTPServerDisconnected)
+        # Backoff of 0.01s then 0.02s before the last attempt.
+        self.assertGreaterEqual(time.monotonic() - started, 0.03)
+
+    def test_full_queue_drops_and_counts(self):
+        FlakyEmailBackend.gate = threading.Event()
+        dispatcher = self.dispatcher(QUEUE_SIZE=1, BATCH_SIZE=1, ENQUEUE_TIMEOUT=0.5)
+        results = []
+
+        accepted = [dispatcher.enqueue(self.make_mail(index, on_done=results.append)) for index in range(3)]
+        FlakyEmailBackend.gate.set()
+
+        self.assertEqual(accepted, [True, True, False])
+        self.assertTrue(dispatcher.flush(5))
+        stats = dispatcher.stats()
+        self.assertEqual((stats["sent"], stats["dropped"], stats["pending"]), (2, 1, 0))
+        self.assertEqual(len(results), 3)
+
+    def test_inline_mode_counts_under_the_same_bookkeeping(self):
+        FlakyEmailBackend.errors = [smtplib.SMTPServerDisconnected("down")]
+        dispatcher = self.dispatcher(WORKERS=0)
+        dispatcher.enqueue(self.make_mail(0))
+        dispatcher.enqueue(self.make_mail(1))
+
+        stats = dispatcher.stats()
+        self.assertEqual((stats["sent"], stats["failed"], stats["pending"]), (1, 1, 0))
+        self.assertTrue(dispatcher.flush(0))
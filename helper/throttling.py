@@ -0,0 +1,72 @@
+import random
+from rest_framework import throttling
+from .shared_store import shared_store
+
+shared_store.register_schema("""
+    CREATE TABLE IF NOT EXISTS throttle_state (
+        key TEXT PRIMARY KEY,
+        tat REAL NOT NULL
+    ) WITHOUT ROWID;
+""")
+
+
+class GCRAThrottle(throttling.SimpleRateThrottle):
+    """
+    Generic cell rate algorithm on top of DRF's rate parsing and cache keys.
+
+    Keeps a single "theoretical arrival time" per key in the shared store instead of a
+    list of timestamps, so state is O(1) per key and limits hold across worker processes.
+    A full `num_requests` burst is allowed, then requests are spaced by duration / num_requests.
+    """
+
+    cleanup_probability = 0.01
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        emission_interval = self.duration / self.num_requests
+        self.now = self.timer()
+        self._wait = 0
+
+        with shared_store.transaction() as connection:
+            row = connection.execute("SELECT tat FROM throttle_state WHERE key = ?", (self.key,)).fetchone()
+            tat = max(row[0], self.now) if row else self.now
+            new_tat = tat + emission_interval
+            allow_at = new_tat - self.duration
+
+            if self.now < allow_at:
+                self._wait = allow_at - self.now
+                return self.throttle_failure()
+
+            connection.execute(
+                "INSERT INTO throttle_state (key, tat) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tat = excluded.tat",
+                (self.key, new_tat),
+            )
+            if random.random() < self.cleanup_probability:
+                connection.execute("DELETE FROM throttle_state WHERE tat < ?", (self.now,))
+
+        return self.throttle_success()
+
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        return self._wait
+
+
+class AnonRateThrottle(throttling.AnonRateThrottle, GCRAThrottle):
+    """GCRA version of DRF's AnonRateThrottle (scope 'anon')."""
+
+
+class UserRateThrottle(throttling.UserRateThrottle, GCRAThrottle):
+    """GCRA version of DRF's UserRateThrottle (scope 'user')."""
+
+
+class ScopedRateThrottle(throttling.ScopedRateThrottle, GCRAThrottle):
+    """GCRA version of DRF's ScopedRateThrottle (e.g. scope 'login')."""
@@ -1,27 +1,34 @@
 import jwt
+import time
+import uuid
 from datetime import datetime, timedelta
 from django.conf import settings  
-from django.contrib.sessions.backends.db import SessionStore
+from django.apps import apps
+from .cache import session_cache
+from .revocation import revocation_list
+from .invalidation import invalidation_bus
+from .signing import key_ring
 from .exceptions import SmoothException
-from datetime import datetime, timedelta
 
 
 
 # Jwt token
 def encode_token(payload):
-    """Encodes a payload into a JWT token using expiration from SIMPLE_JWT settings."""
+    """Encodes a payload into a JWT token with the active signing key and SIMPLE_JWT expiration."""
     expiration_timedelta = settings.SIMPLE_JWT.get("ACCESS_TOKEN_LIFETIME", timedelta(days=2))
     expiration = datetime.now() + expiration_timedelta
     payload["exp"] = expiration    
-    secret_key = settings.SECRET_KEY
-    token = jwt.encode(payload, secret_key, algorithm="HS256")
+    # Sub-second iat so revocations (helper.revocation) cut exactly between tokens minted in the same second.
+    payload.setdefault("iat", round(time.time(), 6))
+    # Tokens minted in the same second for the same claims must still differ (e.g. bulk invitations).
+    payload.setdefault("jti", uuid.uuid4().hex)
+    token = key_ring.encode(payload)
     return token
 
 def decode_token(token):
-    """Decodes a JWT token using the SECRET_KEY from settings."""
+    """Decodes a JWT token with the key named in its header (or SECRET_KEY for legacy HS256 tokens)."""
     try:
-        secret_key = settings.SECRET_KEY
-        payload = jwt.decode(token, secret_key, algorithms=["HS256"])
+        payload = key_ring.decode(token)
         return payload
     except jwt.ExpiredSignatureError:
         raise SmoothException.error(
@@ -35,29 +42,59 @@ def decode_token(token):
         )
 
 # Session
+def _session_model():
+    return apps.get_model('auth_app', 'AuthSession')
+
+
 def retrieve_session(session_key):
-    session = SessionStore(session_key=session_key)
-    if not session.exists(session_key):
+    """Resolves a session key to its data, reading through the session cache."""
+    if not session_key:
+        return None
+
+    session_data = session_cache.get(session_key)
+    if session_data is not None:
+        return session_data
+
+    session = (
+        _session_model().objects.active()
+        .filter(session_key=session_key)
+        .values_list('user_id', 'data', 'expire_date')
+        .first()
+    )
+    if not session:
         return None
 
-    session_data = session.load()
+    user_id, data, expire_date = session
+    session_data = {**data, 'user_id': str(user_id)}
+    session_cache.set(session_key, session_data, expire_date.timestamp())
     return session_data
 
 
 def create_session(data, expiry_seconds=None):
-    session = SessionStore()
-    for key, value in data.items():
-        session[key] = value
-    
-    if expiry_seconds:
-        session.set_expiry(expiry_seconds)
-    session.create()
+    data = dict(data)
+    user_id = data.pop('user_id')
+    session = _session_model().objects.create_session(user_id, data, expiry_seconds)
+    session_cache.set(session.session_key, {**data, 'user_id': str(user_id)}, session.expire_date.timestamp())
     return session.session_key
 
 
 def delete_session(session_key):
-    session = SessionStore(session_key=session_key)
-    session.delete()
+    session_cache.delete(session_key)
+    _session_model().objects.filter(session_key=session_key).delete()
+    invalidation_bus.publish('session', session_key)
+
+
+def revoke_user_sessions(user_id, keep_session=None):
+    """
+    Deletes all sessions of a user (optionally sparing one), drops them from the cache
+    and revokes the user's outstanding stateless tokens.
+    """
+    session_keys = _session_model().objects.revoke_for_user(user_id, keep_session)
+    for session_key in session_keys:
+        session_cache.delete(session_key)
+    invalidation_bus.publish_many('session', session_keys)
+    revocation_list.revoke_user(user_id, keep_session=keep_session)
+    return session_keys
 
 
 def clear_the_cache_for_current_org():
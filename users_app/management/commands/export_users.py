@@ -0,0 +1,31 @@
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from auth_app.models import User
+from users_app import transfer
+
+
+class Command(BaseCommand):
+    help = 'Streams every user to a CSV or NDJSON file (or stdout)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="Output file, '-' for stdout")
+        parser.add_argument('--format', dest='file_format', choices=transfer.FORMATS, help='Defaults to the file extension')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = transfer.detect_format(None if path == '-' else path, options['file_format'])
+        rows = transfer.export_rows(User.objects.all(), file_format, chunk_size=settings.USER_IMPORT['EXPORT_CHUNK_SIZE'])
+
+        count = -1 if file_format == 'csv' else 0
+        target = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+        try:
+            for line in rows:
+                target.write(line)
+                count += 1
+        finally:
+            if target is not sys.stdout:
+                target.close()
+
+        if path != '-':
+            self.stdout.write(self.style.SUCCESS(f"✅ Exported {count} users to {path}."))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from users_app import transfer
+
+
+class Command(BaseCommand):
+    help = 'Creates (or updates) users in chunks from a CSV or NDJSON file without loading it into memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import')
+        parser.add_argument('--format', dest='file_format', choices=transfer.FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--update-existing', action='store_true', help='Update users whose email already exists')
+        parser.add_argument('--invite', action='store_true', help='Mail users imported without a password a link to set one')
+        parser.add_argument('--role', help='Default role id or name for rows without one')
+        parser.add_argument('--chunk-size', type=int, help='Rows per transaction')
+
+    def handle(self, *args, **options):
+        importer = transfer.UserImporter(
+            update_existing=options['update_existing'],
+            invite=options['invite'],
+            default_role=options['role'],
+            chunk_size=options['chunk_size'],
+        )
+        file_format = transfer.detect_format(options['path'], options['file_format'])
+        try:
+            with open(options['path'], 'rb') as source:
+                summary = importer.run(transfer.read_rows(source, file_format))
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['path']}: {e}")
+
+        for error in summary['errors']:
+            self.stdout.write(self.style.WARNING(f"⚠️ Row {error['row']} ({error['email']}): {error['detail']}"))
+        if summary['errors_truncated']:
+            self.stdout.write(self.style.WARNING(f"⚠️ Only the first {len(summary['errors'])} problems are listed."))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported users: {summary['created']} created, {summary['updated']} updated, "
+            f"{summary['unchanged']} unchanged, {summary['skipped']} skipped."
+        ))
+        if summary['created']:
+            self.stdout.write("Run `manage.py generate_avatars` to create the default profile pictures.")
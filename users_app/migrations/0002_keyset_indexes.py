@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invitation',
+            index=models.Index(fields=['created_at', 'id'], name='invitation_created_id_idx'),
+        ),
+    ]
@@ -29,6 +29,9 @@ class Invitation(UUIDPrimaryKey, TimeLine):
     token = models.TextField(unique=True)
     access_url = models.URLField(null=False, blank=False)
     is_accepted = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [models.Index(fields=['created_at', 'id'], name='invitation_created_id_idx')]
     
     @property    
     def is_expired(self):
@@ -1,26 +1,74 @@
+import io
+import csv
+import uuid
+from django.conf import settings
 from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 from users_app import models
 from helper.utils import encode_token
+from helper.mails import send_invitation_emails
 from helper.exceptions import SmoothException
-from auth_app.models import User, Role
+from helper.permissions import normalize_permissions
+from helper.serializers import DynamicFieldsMixin, CompiledListSerializer
+from auth_app.models import User, Role, AuthSession
 
 
-class RoleSerializer(serializers.ModelSerializer):
+class RoleSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Role
         fields = '__all__'
 
+    def validate_permissions(self, value):
+        return normalize_permissions(value)
 
-class UserSerializer(serializers.ModelSerializer):
-    role = RoleSerializer(read_only=True)
+    def validate_parents(self, value):
+        """Keeps the role hierarchy acyclic: a role cannot inherit from itself or its descendants."""
+        if self.instance is not None:
+            forbidden = {self.instance.id} | Role.objects.descendant_ids([self.instance.id])
+            cyclic = [parent.name for parent in value if parent.id in forbidden]
+            if cyclic:
+                raise SmoothException.error(
+                    detail=f"Role '{self.instance.name}' cannot inherit from: {', '.join(cyclic)}",
+                    dev_message=f"Parents {cyclic} would create a cycle in the role hierarchy",
+                )
+        return value
+
+
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'role': (RoleSerializer, {})}
+    default_expand = ('role',)
     
     class Meta:
         model = User
         exclude = ['password', 'profile_picture']
+        list_serializer_class = CompiledListSerializer
+
+        
+class AuthSessionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    ip_address = serializers.SerializerMethodField()
+    user_agent = serializers.SerializerMethodField()
+    is_current = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AuthSession
+        fields = ['session_key', 'created_at', 'expire_date', 'ip_address', 'user_agent', 'is_current']
+
+    def get_ip_address(self, obj):
+        return obj.data.get('ip_address')
+
+    def get_user_agent(self, obj):
+        return obj.data.get('user_agent')
+
+    def get_is_current(self, obj):
+        request = self.context.get('request')
+        decoded_payload = getattr(request, 'decoded_payload', None) or {}
+        return obj.session_key == decoded_payload.get('session_key')
 
         
-class UserSelfUpdateSerializer(serializers.ModelSerializer):
+class UserSelfUpdateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     email = serializers.EmailField(read_only = True)
     
     class Meta:
@@ -28,7 +76,7 @@ class UserSelfUpdateSerializer(serializers.ModelSerializer):
         fields = ['id', 'first_name', 'last_name', 'email', 'profile_picture']
         
 
-class UserUpdateSerializer(serializers.ModelSerializer):
+class UserUpdateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     email = serializers.EmailField(read_only = True)
     
     class Meta:
@@ -36,7 +84,7 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         fields = ['id', 'role']
                 
     
-class InvitationSerializer(serializers.ModelSerializer):
+class InvitationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     is_expired = serializers.ReadOnlyField()    
     token = serializers.CharField(write_only=True, required=False)
     role_id = serializers.CharField(write_only=True, required=True)
@@ -57,5 +105,141 @@ class InvitationSerializer(serializers.ModelSerializer):
                 dev_message=f"Attempted to invite an existing user: {to_email}",
             )
         
-        invitation = models.Invitation.objects.create(from_email=from_email, to_email=to_email, access_url = access_url, token=token)
+        # The invitation mail is written to the outbox by a post_save signal, in this same transaction.
+        with transaction.atomic():
+            invitation = models.Invitation.objects.create(from_email=from_email, to_email=to_email, access_url = access_url, token=token)
         return invitation
+
+
+class InvitationBulkSerializer(serializers.Serializer):
+    """
+    Invites many people at once from a JSON list or an uploaded CSV (`email`/`to_email` and optional
+    `role_id` columns). Existing users, pending invitations and roles are checked with set-based
+    queries, invitations are inserted with bulk_create and their mails queued in one outbox batch.
+    Every row gets a result; rows that cannot be invited are skipped instead of failing the request.
+    """
+
+    LOOKUP_BATCH_SIZE = 900  # emails per IN (...) lookup, below SQLite's historical parameter limit
+
+    access_url = serializers.URLField()
+    role_id = serializers.UUIDField(required=False)
+    from_email = serializers.EmailField(required=False)
+    invitations = serializers.ListField(child=serializers.DictField(), required=False)
+    file = serializers.FileField(required=False, write_only=True)
+
+    def validate(self, attrs):
+        if 'file' in attrs:
+            attrs['invitations'] = self.read_csv(attrs.pop('file'))
+        rows = attrs.get('invitations')
+        if not rows:
+            raise SmoothException.error(
+                detail="Provide a list of invitations or a CSV file.",
+                dev_message="Bulk invitation request without rows",
+            )
+
+        max_rows = settings.INVITATION_BULK_MAX_ROWS
+        if len(rows) > max_rows:
+            raise SmoothException.error(
+                detail=f"At most {max_rows} invitations can be sent at once.",
+                dev_message=f"Bulk invitation request with {len(rows)} rows",
+            )
+        return attrs
+
+    @staticmethod
+    def read_csv(upload):
+        try:
+            reader = csv.DictReader(io.TextIOWrapper(upload, encoding='utf-8-sig'))
+            return [
+                {'to_email': row.get('to_email') or row.get('email'), 'role_id': row.get('role_id')}
+                for row in reader
+            ]
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise SmoothException.error(
+                detail="The uploaded file is not a valid UTF-8 CSV file.",
+                dev_message=f"Bulk invitation CSV could not be parsed: {e}",
+            )
+
+    @staticmethod
+    def chunks(values, size):
+        values = list(values)
+        for start in range(0, len(values), size):
+            yield values[start:start + size]
+
+    def create(self, validated_data):
+        request = self.context.get('request')
+        access_url = validated_data['access_url']
+        from_email = validated_data.get('from_email') or getattr(getattr(request, 'user', None), 'email', None)
+        default_role_id = validated_data.get('role_id')
+        email_field = models.Invitation._meta.get_field('to_email')
+
+        results, candidates, seen = [], {}, set()
+        for index, row in enumerate(validated_data['invitations']):
+            email = User.objects.normalize_email(str(row.get('to_email') or '').strip())
+            result = {'row': index, 'to_email': email, 'status': 'invited'}
+            results.append(result)
+            try:
+                email_field.run_validators(email)
+                if not email:
+                    raise DjangoValidationError("Email is required.")
+            except DjangoValidationError:
+                result.update(status='invalid_email', detail="Enter a valid email address.")
+                continue
+            if email.lower() in seen:
+                result.update(status='duplicate', detail="This email appears more than once in the request.")
+                continue
+            seen.add(email.lower())
+
+            try:
+                role_id = uuid.UUID(str(row.get('role_id') or default_role_id))
+            except ValueError:
+                result.update(status='invalid_role', detail="A valid role_id is required.")
+                continue
+            candidates[email] = (result, role_id)
+
+        role_ids = {role_id for _, role_id in candidates.values()}
+        known_roles = set(Role.objects.filter(id__in=role_ids).values_list('id', flat=True)) if role_ids else set()
+
+        # Emails are compared lowercased, like the duplicate check above and the user import.
+        existing_users, pending = set(), set()
+        pending_since = timezone.now() - settings.INVITATION_EXPIRATION_TIME
+        for emails in self.chunks({email.lower() for email in candidates}, self.LOOKUP_BATCH_SIZE):
+            existing_users.update(
+                User.objects.annotate(email_lower=Lower('email'))
+                .filter(email_lower__in=emails)
+                .values_list('email_lower', flat=True)
+            )
+            pending.update(
+                models.Invitation.objects.annotate(to_email_lower=Lower('to_email'))
+                .filter(to_email_lower__in=emails, is_accepted=False, created_at__gte=pending_since)
+                .values_list('to_email_lower', flat=True)
+            )
+
+        invitations = []
+        for email, (result, role_id) in candidates.items():
+            if role_id not in known_roles:
+                result.update(status='invalid_role', detail="Role does not exist.")
+            elif email.lower() in existing_users:
+                result.update(status='user_exists', detail="A user with this email address already exists.")
+            elif email.lower() in pending:
+                result.update(status='already_invited', detail="A pending invitation already exists for this email.")
+            else:
+                invitation = models.Invitation(
+                    from_email=from_email, to_email=email, access_url=access_url,
+                    token=encode_token({"role_id": str(role_id)}),
+                )
+                result['id'] = invitation.id
+                invitations.append(invitation)
+
+        # bulk_create skips post_save, so the invitation mails are queued explicitly in the same transaction.
+        with transaction.atomic():
+            models.Invitation.objects.bulk_create(invitations, batch_size=500)
+            send_invitation_emails(invitations)
+
+        return {
+            'invited': len(invitations),
+            'skipped': len(results) - len(invitations),
+            'results': results,
+        }
+
+    def to_representation(self, instance):
+        return instance
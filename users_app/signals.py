@@ -8,7 +8,8 @@ from django.contrib.auth import get_user_model
 @receiver(post_save, sender=models.Invitation)
 def send_invitation_email(sender, instance, created, **kwargs):
     """
-    Sends an invitation email to the recipient when an invitation is created.
+    Queues an invitation email in the outbox when an invitation is created; it is only sent
+    once the transaction creating the invitation commits.
     """
     if created:
         instance.send_invitation_email()
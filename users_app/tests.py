@@ -0,0 +1,358 @@
+import json
+import base64
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from auth_app.models import User, Role, AuthSession
+from extras_app.models import OutboxMail
+from helper.shared_store import shared_store
+from helper.testing import isolated_shared_store
+from helper.utils import create_session, encode_token, decode_token
+from users_app import transfer
+from users_app.models import Invitation
+from users_app.serializers import InvitationBulkSerializer
+
+
+def create_role(name, permissions=(), parents=()):
+    role = Role.objects.create(name=name, permissions=list(permissions))
+    if parents:
+        role.parents.set(parents)
+        role.refresh_from_db()
+    return role
+
+
+def create_user(email, role, **extra_fields):
+    # A stored picture path skips the default avatar rendering in User.save().
+    extra_fields.setdefault('profile_picture', 'images/profile_pictures/test.png')
+    return User.objects.create(email=email, role=role, password=make_password(None), **extra_fields)
+
+
+def login_token(user, **data):
+    session_key = create_session({'user_id': str(user.id), **data})
+    return session_key, encode_token({'session_key': session_key, 'user_id': str(user.id)})
+
+
+@isolated_shared_store
+class UsersAPITestCase(APITestCase):
+
+    def setUp(self):
+        shared_store.connection().execute("DELETE FROM throttle_state")
+
+    def authenticate(self, user, **data):
+        session_key, token = login_token(user, **data)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return session_key, token
+
+
+class SessionManagementTests(UsersAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.member = create_user('member@example.com', create_role('Member'))
+        self.admin_role = create_role('Session admin', ['user.list'])
+        self.admin = create_user('admin@example.com', self.admin_role)
+
+    def test_session_list_hides_password_reset_sessions(self):
+        current, _ = self.authenticate(self.member)
+        create_session({'user_id': str(self.member.id), 'purpose': 'password_reset'})
+
+        res = self.client.get('/api/user/self/sessions/')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([session['session_key'] for session in res.data['results']], [current])
+
+    def test_password_reset_session_is_not_a_bearer_token(self):
+        self.authenticate(self.member, purpose='password_reset')
+        self.assertEqual(self.client.get('/api/user/self/').status_code, 401)
+
+    def test_sign_out_others_keeps_current_session(self):
+        _, other_token = login_token(self.member)
+        current, _ = self.authenticate(self.member)
+
+        res = self.client.delete('/api/user/self/sessions/')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(list(AuthSession.objects.filter(user=self.member).values_list('session_key', flat=True)), [current])
+        self.assertEqual(self.client.get('/api/user/self/').status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {other_token}')
+        self.assertEqual(self.client.get('/api/user/self/').status_code, 401)
+
+    def test_cannot_revoke_another_users_session(self):
+        admin_session, _ = login_token(self.admin)
+        self.authenticate(self.member)
+
+        res = self.client.delete(f'/api/user/self/sessions/{admin_session}/')
+
+        self.assertEqual(res.status_code, 404)
+        self.assertTrue(AuthSession.objects.filter(session_key=admin_session).exists())
+
+    def test_admin_sessions_endpoint_requires_permission_per_method(self):
+        login_token(self.member)
+        self.authenticate(self.admin)
+
+        self.assertEqual(self.client.get(f'/api/user/users/{self.member.id}/sessions/').status_code, 200)
+        self.assertEqual(self.client.delete(f'/api/user/users/{self.member.id}/sessions/').status_code, 403)
+        self.assertTrue(AuthSession.objects.filter(user=self.member).exists())
+
+        self.authenticate(self.member)
+        self.assertEqual(self.client.get(f'/api/user/users/{self.admin.id}/sessions/').status_code, 403)
+
+
+class InheritedPermissionTests(UsersAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.parent = create_role('Viewer', ['user.list'])
+        self.child = create_role('Auditor', ['role.permissions.view'], parents=[self.parent])
+        self.user = create_user('auditor@example.com', self.child)
+        self.authenticate(self.user)
+
+    def slugs(self, permissions):
+        return sorted({permission['slug'] for permission in permissions})
+
+    def test_self_permissions_match_what_the_user_is_granted(self):
+        self.assertEqual(self.client.get('/api/user/users/').status_code, 200)
+
+        res = self.client.get('/api/user/self/permissions/')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.slugs(res.data['permissions']), ['role.permissions.view', 'user.list'])
+
+    def test_parent_changes_reach_self_permissions(self):
+        self.parent.permissions = ['user.list', 'user.export']
+        self.parent.save()
+
+        res = self.client.get('/api/user/self/permissions/')
+
+        self.assertIn('user.export', self.slugs(res.data['permissions']))
+        self.assertEqual(self.client.get('/api/user/users/export/').status_code, 200)
+
+    def test_role_permissions_list_only_own_slugs(self):
+        res = self.client.get(f'/api/user/roles/{self.child.id}/permissions/')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.slugs(res.data), ['role.permissions.view'])
+
+    def test_role_effective_permissions_include_inherited(self):
+        res = self.client.get(f'/api/user/roles/{self.child.id}/effective-permissions/')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.slugs(res.data), ['role.permissions.view', 'user.list'])
+
+
+class UserListQueryTests(UsersAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.roles = [create_role('Lister', ['user.list'])]
+        self.roles.append(create_role('Child', parents=[self.roles[0]]))
+        self.admin = create_user('lister@example.com', self.roles[0])
+        self.authenticate(self.admin)
+        # Warms the per-process session and revocation caches, which earlier tests may have reset.
+        self.client.get('/api/user/users/')
+
+    def add_users(self, count):
+        for i in range(count):
+            create_user(f'user{User.objects.count()}-{i}@example.com', self.roles[i % 2])
+
+    def test_user_list_query_count_does_not_grow_with_users(self):
+        from users_app.views import UserViewSet
+        for total in (3, 40):
+            self.add_users(total - User.objects.count())
+            with self.assertNumQueries(4):
+                res = self.client.get('/api/user/users/')
+            self.assertEqual(len(res.data['results']), total)
+            self.assertLessEqual(int(res['X-Query-Count']), UserViewSet.query_budget['GET'])
+
+    def test_not_modified_user_list_skips_the_page(self):
+        etag = self.client.get('/api/user/users/')['ETag']
+        with self.assertNumQueries(2):
+            res = self.client.get('/api/user/users/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+
+class DynamicFieldsTests(UsersAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.role = create_role('Lister', ['user.list'])
+        self.authenticate(create_user('lister@x.com', self.role))
+        # Warms the per-process session and revocation caches, which earlier tests may have reset.
+        self.client.get('/api/user/users/')
+
+    def get_user(self, query, queries):
+        with CaptureQueriesContext(connection) as captured:
+            res = self.client.get(f'/api/user/users/?{query}')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(captured), queries)
+        # Principal lookup, ETag aggregate, then the page itself.
+        return res.json()['results'][0], captured.captured_queries[2]['sql']
+
+    def test_fields_limit_keys_and_columns(self):
+        user, sql = self.get_user('fields=id,email', queries=3)
+
+        self.assertEqual(list(user), ['id', 'email'])
+        self.assertNotIn('first_name', sql)
+        self.assertNotIn('auth_app_role', sql)
+
+    def test_unknown_fields_are_ignored(self):
+        user, _ = self.get_user('fields=id,nope', queries=3)
+        self.assertEqual(list(user), ['id'])
+
+    def test_empty_expand_renders_the_role_as_its_key(self):
+        user, sql = self.get_user('expand=', queries=3)
+
+        self.assertEqual(user['role'], str(self.role.id))
+        self.assertNotIn('JOIN', sql)
+
+    def test_expand_role_renders_it_nested(self):
+        user, _ = self.get_user('expand=role', queries=4)
+        self.assertEqual((user['role']['name'], user['role']['parents']), ('Lister', []))
+
+    def test_dotted_fields_select_columns_of_the_expanded_relation(self):
+        user, sql = self.get_user('fields=id,role.name', queries=3)
+
+        self.assertEqual(user, {'id': user['id'], 'role': {'name': 'Lister'}})
+        self.assertIn('"auth_app_role"."name"', sql)
+        self.assertNotIn('"auth_app_role"."permissions"', sql)
+
+
+class KeysetPaginationTests(UsersAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        role = create_role('Lister', ['user.list'])
+        self.authenticate(create_user('lister@x.com', role, first_name='Zed'))
+        for index in range(5):
+            create_user(f'user{index}@x.com', role, first_name='Same' if index < 4 else 'Other')
+
+    def ids(self, res):
+        return [str(user['id']) for user in res.data['results']]
+
+    def expected(self, *ordering):
+        return [str(pk) for pk in User.objects.order_by(*ordering).values_list('id', flat=True)]
+
+    def walk(self, url):
+        pages = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 200)
+            pages.append(res)
+            url = res.data['next']
+        return pages
+
+    def test_walks_forward_and_back_through_ties(self):
+        pages = self.walk('/api/user/users/?ordering=first_name&page_size=2')
+
+        self.assertEqual([self.ids(page) for page in pages], [self.expected('first_name', 'id')[i:i + 2] for i in (0, 2, 4)])
+        self.assertIsNone(pages[0].data['previous'])
+
+        back = self.client.get(pages[2].data['previous'])
+        self.assertEqual(self.ids(back), self.ids(pages[1]))
+        back = self.client.get(back.data['previous'])
+        self.assertEqual(self.ids(back), self.ids(pages[0]))
+        self.assertIsNone(back.data['previous'])
+        self.assertEqual(self.ids(self.client.get(back.data['next'])), self.ids(pages[1]))
+
+    def test_unknown_ordering_falls_back_to_newest_first(self):
+        pages = self.walk('/api/user/users/?ordering=password&page_size=4')
+        self.assertEqual([pk for page in pages for pk in self.ids(page)], self.expected('-created_at', '-id'))
+
+    def test_invalid_cursors_are_not_found(self):
+        def cursor(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+        for value in ('not-a-cursor', '%%%', cursor([0, ['2024-01-01T00:00:00']]), cursor([0, ['2024-01-01', 'not-a-uuid']]), cursor({'a': 1})):
+            with self.subTest(cursor=value):
+                self.assertEqual(self.client.get('/api/user/users/', {'cursor': value}).status_code, 404)
+
+
+class InvitationBulkTests(UsersAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.role = create_role('Member')
+        create_user('member@x.com', self.role)
+        Invitation.objects.create(from_email='admin@x.com', to_email='pending@x.com', access_url='https://app.x.com', token='t')
+
+    def invite(self, *emails):
+        serializer = InvitationBulkSerializer(data={
+            'access_url': 'https://app.x.com', 'role_id': str(self.role.id), 'from_email': 'admin@x.com',
+            'invitations': [{'to_email': email} for email in emails],
+        })
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_existing_users_and_pending_invitations_match_case_insensitively(self):
+        result = self.invite('Member@x.com', 'PENDING@x.com', 'fresh@x.com')
+
+        self.assertEqual([row['status'] for row in result['results']], ['user_exists', 'already_invited', 'invited'])
+        self.assertEqual(result['invited'], 1)
+
+
+@override_settings(FRONTEND_DOMAIN='https://app.example.com')
+class UserImportTests(UsersAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.role = create_role('Importer', ['user.import'])
+        self.existing = create_user('imp1@x.com', self.role, first_name='Old')
+
+    def run_import(self, rows, **options):
+        return transfer.UserImporter(default_role='Importer', **options).run(rows)
+
+    def test_existing_users_match_case_insensitively(self):
+        summary = self.run_import([{'email': 'Imp1@x.com', 'first_name': 'New'}], update_existing=True)
+
+        self.assertEqual((summary['created'], summary['updated']), (0, 1))
+        self.assertEqual(User.objects.filter(email__iexact='imp1@x.com').count(), 1)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.first_name, 'New')
+
+        summary = self.run_import([{'email': 'IMP1@x.com'}])
+        self.assertEqual(summary['errors'][0]['detail'], "A user with this email address already exists.")
+
+    def test_duplicates_in_the_file_differ_only_in_case(self):
+        summary = self.run_import([{'email': 'new@x.com'}, {'email': 'NEW@x.com'}])
+
+        self.assertEqual((summary['created'], summary['skipped']), (1, 1))
+        self.assertEqual(summary['errors'][0]['row'], 2)
+
+    def test_invite_sends_a_password_set_link(self):
+        with self.captureOnCommitCallbacks():
+            self.run_import([{'email': 'invitee@x.com', 'first_name': 'Ann'}], invite=True)
+
+        user = User.objects.get(email='invitee@x.com')
+        self.assertFalse(user.has_usable_password())
+        session = AuthSession.objects.get(user=user)
+        self.assertEqual(session.data, {'purpose': 'password_reset'})
+
+        outbox = OutboxMail.objects.get(receiver_email='invitee@x.com')
+        self.assertEqual(outbox.template_name, 'email/password_reset.html')
+        token = outbox.context['reset_url'].split('session_token=')[1]
+        self.assertTrue(outbox.context['reset_url'].startswith('https://app.example.com/reset-password?'))
+        self.assertEqual(decode_token(token)['session_key'], session.session_key)
+
+    def test_http_import_skips_passwords(self):
+        self.authenticate(self.existing)
+        upload = SimpleUploadedFile('users.csv', b'email,password\na@x.com,\nb@x.com,secret-pass\n', content_type='text/csv')
+
+        res = self.client.post('/api/user/users/import/', {'file': upload, 'role': 'Importer'})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual((res.data['created'], res.data['skipped']), (1, 1))
+        self.assertFalse(User.objects.filter(email='b@x.com').exists())
+
+    def test_http_import_rejects_large_files(self):
+        self.authenticate(self.existing)
+        upload = SimpleUploadedFile('users.csv', b'email\n' + b'a@x.com\n' * 20, content_type='text/csv')
+
+        with override_settings(USER_IMPORT={**settings.USER_IMPORT, 'HTTP_MAX_BYTES': 64}):
+            res = self.client.post('/api/user/users/import/', {'file': upload})
+
+        self.assertEqual(res.status_code, 413)
+        self.assertFalse(User.objects.filter(email='a@x.com').exists())
@@ -0,0 +1,293 @@
+import io
+import csv
+import json
+from itertools import islice
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from helper.exceptions import SmoothException
+from helper.hashing import password_hashing
+from helper.invalidation import invalidation_bus
+from helper.mails import outbox_relay, password_reset_mail
+from helper.utils import encode_token, revoke_user_sessions
+from auth_app.models import User, Role, AuthSession
+
+EXPORT_FIELDS = ['id', 'email', 'first_name', 'last_name', 'is_active', 'role_id', 'role', 'created_at', 'last_login']
+FORMATS = ('csv', 'ndjson')
+
+
+def detect_format(name, requested=None):
+    """The requested format, or the one implied by the file name (CSV by default)."""
+    file_format = (requested or ('ndjson' if str(name or '').lower().endswith(('.ndjson', '.jsonl')) else 'csv')).lower()
+    if file_format not in FORMATS:
+        raise SmoothException.error(
+            detail=f"Unsupported format '{file_format}'. Use one of: {', '.join(FORMATS)}.",
+            dev_message=f"User transfer requested with format {file_format}",
+        )
+    return file_format
+
+
+###################################################################### Export ######################################################################
+
+
+class _Echo:
+    """File-like object whose write() returns the line, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, file_format, chunk_size=2000):
+    """
+    Yields the users of `queryset` as CSV lines or NDJSON records, `chunk_size` rows per database fetch.
+    Only the exported columns are read and no model instances are built, so memory stays flat.
+    """
+    rows = (
+        queryset.order_by('created_at', 'id')
+        .values_list('id', 'email', 'first_name', 'last_name', 'is_active', 'role_id', 'role__name', 'created_at', 'last_login')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    if file_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow([
+                '' if value is None else value.isoformat() if hasattr(value, 'isoformat') else value
+                for value in row
+            ])
+        return
+
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+###################################################################### Import ######################################################################
+
+
+def read_rows(binary_file, file_format):
+    """Yields one dict per CSV row or NDJSON line, decoding the file incrementally."""
+    text = io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='' if file_format == 'csv' else None)
+    try:
+        if file_format == 'csv':
+            yield from csv.DictReader(text)
+            return
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict):
+                yield {'__error__': f"Line {line_number} is not a JSON object."}
+                continue
+            yield record
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise SmoothException.error(
+            detail="The uploaded file is not a valid UTF-8 CSV or NDJSON file.",
+            dev_message=f"User import could not be parsed: {e}",
+        )
+    finally:
+        text.detach()
+
+
+def parse_flag(value, default=True):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+class UserImporter:
+    """
+    Creates (and with `update_existing`, updates) users from an iterable of row dicts in chunks.
+
+    Per chunk: one IN query for existing emails (compared case-insensitively), role lookups for
+    roles not seen yet, one bulk_create and one bulk_update inside a transaction. Rows with a
+    `password` are hashed in parallel on the password hashing pool, unless `allow_passwords` is off
+    (HTTP uploads), in which case they are skipped. The others get an unusable password and, with
+    `invite`, a password-set session and its reset-link mail, queued in one outbox batch.
+    Avatars are not generated here (see `manage.py generate_avatars`). Only counters and the first
+    MAX_ERRORS problems are kept, so memory does not grow with the file.
+    """
+
+    MAX_ERRORS = 100
+
+    def __init__(self, update_existing=False, invite=False, default_role=None, chunk_size=None, allow_passwords=True):
+        self.update_existing = update_existing
+        self.invite = invite
+        self.allow_passwords = allow_passwords
+        self.default_role = default_role
+        self.chunk_size = chunk_size or settings.USER_IMPORT['CHUNK_SIZE']
+        self.email_field = User._meta.get_field('email')
+        self.roles = {}
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.errors = []
+
+    def run(self, rows):
+        rows = iter(rows)
+        row_number = 0
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(enumerate(chunk, start=row_number + 1))
+            row_number += len(chunk)
+        return self.summary()
+
+    def summary(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'errors_truncated': self.skipped > len(self.errors),
+        }
+
+    def skip(self, row_number, email, detail):
+        self.skipped += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append({'row': row_number, 'email': email, 'detail': detail})
+
+    def resolve_roles(self, references):
+        """Loads the roles referenced by id or name that were not resolved by an earlier chunk."""
+        missing = {reference for reference in references if reference not in self.roles}
+        if not missing:
+            return
+        ids = []
+        for reference in missing:
+            try:
+                ids.append(Role._meta.pk.to_python(reference))
+            except ValidationError:
+                pass
+        for role in Role.objects.filter(id__in=ids).only('id', 'name'):
+            self.roles[str(role.id)] = role.id
+        for role_id, name in Role.objects.filter(name__in=missing).values_list('id', 'name'):
+            self.roles.setdefault(name, role_id)
+        for reference in missing:
+            self.roles.setdefault(reference, None)
+
+    def import_chunk(self, numbered_rows):
+        parsed = {}
+        for row_number, row in numbered_rows:
+            if '__error__' in row:
+                self.skip(row_number, None, row['__error__'])
+                continue
+
+            email = User.objects.normalize_email(str(row.get('email') or '').strip())
+            try:
+                if not email:
+                    raise ValidationError("Email is required.")
+                self.email_field.run_validators(email)
+            except ValidationError:
+                self.skip(row_number, email, "Enter a valid email address.")
+                continue
+            if email.lower() in parsed:
+                self.skip(row_number, email, "This email appears more than once in the file.")
+                continue
+            if row.get('password') and not self.allow_passwords:
+                self.skip(row_number, email, "Passwords can only be imported with `manage.py import_users`.")
+                continue
+
+            role = str(row.get('role_id') or row.get('role') or self.default_role or '').strip()
+            parsed[email.lower()] = (row_number, row, role, email)
+
+        self.resolve_roles({role for _, _, role, _ in parsed.values() if role})
+        existing = {
+            user.email_lower: user
+            for user in User.objects.annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=parsed)
+            .only('id', 'email', 'first_name', 'last_name', 'is_active', 'role_id')
+        }
+
+        now = timezone.now()
+        new_users, changed_users, passwords, deactivated = [], [], [], []
+        changed_fields = {'updated_at'}
+        for key, (row_number, row, role, email) in parsed.items():
+            user = existing.get(key)
+            if user is not None and not self.update_existing:
+                self.skip(row_number, email, "A user with this email address already exists.")
+                continue
+
+            role_id = self.roles.get(role) if role else getattr(user, 'role_id', None)
+            if role_id is None:
+                self.skip(row_number, email, f"Role '{role}' does not exist." if role else "A role or role_id is required.")
+                continue
+
+            if user is not None:
+                # Columns missing or empty in the row keep their current values; unchanged users are not written.
+                was_active = user.is_active
+                values = {'is_active': parse_flag(row.get('is_active'), default=was_active), 'role_id': role_id}
+                for name in ('first_name', 'last_name'):
+                    if row.get(name) not in (None, ''):
+                        values[name] = str(row[name])[:30]
+                changed = {name for name, value in values.items() if getattr(user, name) != value}
+                if not changed:
+                    self.unchanged += 1
+                    continue
+
+                for name in changed:
+                    setattr(user, name, values[name])
+                user.updated_at = now
+                changed_fields |= {'role' if name == 'role_id' else name for name in changed}
+                if was_active and not user.is_active:
+                    deactivated.append(user.id)
+                changed_users.append(user)
+                continue
+
+            user = User(
+                email=email,
+                first_name=str(row.get('first_name') or '')[:30],
+                last_name=str(row.get('last_name') or '')[:30],
+                is_active=parse_flag(row.get('is_active')),
+                role_id=role_id,
+            )
+            password = row.get('password')
+            if password:
+                passwords.append((user, password))
+            else:
+                user.password = make_password(None)
+            new_users.append(user)
+
+        if passwords:
+            hashes = password_hashing.hash_many([password for _, password in passwords])
+            for (user, _), encoded in zip(passwords, hashes):
+                user.password = encoded
+
+        with transaction.atomic():
+            User.objects.bulk_create(new_users, batch_size=500)
+            if changed_users:
+                User.objects.bulk_update(changed_users, sorted(changed_fields), batch_size=500)
+            if self.invite:
+                self.queue_invitations([user for user in new_users if not user.has_usable_password()])
+            if changed_users:
+                # bulk_update sends no post_save, so cached principals are invalidated here.
+                user_ids = [user.id for user in changed_users]
+                transaction.on_commit(lambda: invalidation_bus.publish_many('user', user_ids))
+
+        for user_id in deactivated:
+            revoke_user_sessions(user_id)
+
+        self.created += len(new_users)
+        self.updated += len(changed_users)
+
+    def queue_invitations(self, users):
+        """A password-set session per user and its reset-link mail, written in the caller's transaction."""
+        expiry_seconds = settings.USER_IMPORT['INVITE_EXPIRATION'].total_seconds()
+        sessions = AuthSession.objects.create_sessions(
+            [user.id for user in users], {"purpose": "password_reset"}, expiry_seconds=expiry_seconds,
+        )
+        outbox_relay.add_many([
+            password_reset_mail(user, encode_token({'session_key': session.session_key}), subject="Welcome to Gene")
+            for user, session in zip(users, sessions)
+        ])
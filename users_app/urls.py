@@ -9,18 +9,31 @@ router.register(r'roles', views.RoleViewSet, basename='roles')
 router.register(r'users', views.UserViewSet, basename='users')
 
 urlpatterns = [
+    # Bulk user transfer (before the router, whose users/<pk>/ route would match these paths)
+    path('users/export/', views.UserExportView.as_view(), name='users-export'),
+    path('users/import/', views.UserImportView.as_view(), name='users-import'),
+
     path('', include(router.urls)),
 
     # Role Permissions Retrieve/Update
     path('roles/<uuid:role_id>/permissions/', views.RolePermissionsRetrieveUpdateView.as_view(),name='role-permissions'),
+    path('roles/<uuid:role_id>/effective-permissions/', views.RoleEffectivePermissionsView.as_view(), name='role-effective-permissions'),
     path('permissions/all/', views.AllPermissionsListView.as_view(), name='all-permissions'),
 
+    # User sessions list/revoke
+    path('users/<uuid:user_id>/sessions/', views.UserSessionsView.as_view(), name='user-sessions'),
+
     # Self user retrieve/update
     path('self/', views.UserSelfRetrieveUpdateView.as_view(), name='user-self'),
 
+    # Self user sessions list/revoke
+    path('self/sessions/', views.SelfSessionListView.as_view(), name='user-self-sessions'),
+    path('self/sessions/<str:session_key>/', views.SelfSessionDestroyView.as_view(), name='user-self-session-detail'),
+
     # Self user permissions view
     path('self/permissions/', views.SelfUserPermissionsView.as_view(), name='user-self-permissions'),
 
     # Invitations list/create
     path('invitations/', views.InvitationListCreateView.as_view(), name='invitations'),
+    path('invitations/bulk/', views.InvitationBulkCreateView.as_view(), name='invitations-bulk'),
 ]
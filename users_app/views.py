@@ -1,26 +1,41 @@
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, filters
 from rest_framework import views, generics, viewsets, status, response
-from auth_app.models import User, Role
+from auth_app.models import User, Role, AuthSession
 from users_app import permissions
-from . import serializers
+from . import serializers, transfer
 from users_app import models
 from rest_framework.exceptions import PermissionDenied
 from django.db import transaction
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.parsers import MultiPartParser
+from helper.exceptions import SmoothException
+from helper.utils import delete_session, revoke_user_sessions
+from helper.revocation import revocation_list
+from helper.permissions import normalize_permissions, expand_permissions, permission_registry
+from helper.conditional import ConditionalRequestMixin
 
 ###################################################################### Role & Permissions Views ######################################################################
 
 
-class RoleViewSet(viewsets.ModelViewSet):
+class RoleViewSet(ConditionalRequestMixin, viewsets.ModelViewSet):
     serializer_class = serializers.RoleSerializer
     permission_slugs = ("role.list", "role.create", "role.update", "role.delete")
-    queryset = Role.objects.all()
+    queryset = Role.objects.prefetch_related('parents')
+    query_budget = {'GET': 4}  # principal, ETag aggregate, page, parents (sessions come from the session cache)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = self.get_serializer().prune_queryset(queryset)
+        return queryset
 
     def get_object(self):
         obj = super().get_object()
         if obj.is_system and self.request.method != 'GET':
             raise PermissionDenied("System roles cannot be modified or deleted.")
-        return super().get_object()
+        return obj
 
 
 class RolePermissionsRetrieveUpdateView(generics.RetrieveUpdateAPIView):
@@ -37,35 +52,50 @@ class RolePermissionsRetrieveUpdateView(generics.RetrieveUpdateAPIView):
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        return response.Response(serializer.data.get('permissions', []), status=status.HTTP_200_OK)
+        return response.Response(expand_permissions(instance.permissions), status=status.HTTP_200_OK)
     
     def update(self, request, *args, **kwargs):
         return response.Response({'detail': 'Use PATCH method to update permissions.'}, status=status.HTTP_400_BAD_REQUEST)
 
     def partial_update(self, request, *args, **kwargs):
         instance = self.get_object()
-        permissions = request.data.get('permissions', [])
-        instance.permissions = permissions
+        instance.permissions = normalize_permissions(request.data.get('permissions', []))
         instance.save()
-        return response.Response(permissions, status=status.HTTP_200_OK)
+        return response.Response(expand_permissions(instance.permissions), status=status.HTTP_200_OK)
 
 
+class RoleEffectivePermissionsView(generics.RetrieveAPIView):
+    """The role's own permissions plus everything it inherits from its parents (read only)."""
+    permission_slugs = ("role.permissions.view",)
+    queryset = Role.objects.all()
+
+    def retrieve(self, request, *args, **kwargs):
+        role = generics.get_object_or_404(Role, id=self.kwargs.get('role_id'))
+        return response.Response(expand_permissions(role.effective_permissions), status=status.HTTP_200_OK)
+
 
 
 class AllPermissionsListView(views.APIView):
     permission_slugs = ("role.permissions.view")
     
     def get(self, request):
-        from helper.permissions import all_permissions_list
-        return response.Response(all_permissions_list, status=status.HTTP_200_OK)
+        """Serves the pre-rendered catalog bytes; unchanged catalogs answer 304 via ETag."""
+        catalog = permission_registry.catalog()
+        if request.headers.get('If-None-Match') == catalog.etag:
+            http_response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            http_response = HttpResponse(catalog.json_bytes, content_type='application/json')
+        http_response['ETag'] = catalog.etag
+        http_response['Cache-Control'] = 'private, no-cache'
+        return http_response
 
 ###################################################################### Self User Views ######################################################################
     
     
-class UserSelfRetrieveUpdateView(generics.RetrieveUpdateAPIView):
+class UserSelfRetrieveUpdateView(ConditionalRequestMixin, generics.RetrieveUpdateAPIView):
     serializer_class = serializers.UserSelfUpdateSerializer
     queryset = User.objects.all()
+    validator_related = ('role',)
 
     def get_object(self):
         return self.request.user
@@ -76,28 +106,64 @@ class UserSelfRetrieveUpdateView(generics.RetrieveUpdateAPIView):
         return super().get_serializer_class()
     
 
-class SelfUserPermissionsView(generics.RetrieveAPIView):
+class SelfUserPermissionsView(ConditionalRequestMixin, generics.RetrieveAPIView):
     serializer_class = serializers.RoleSerializer
     queryset = Role.objects.all()
     
     def get(self, request, *args, **kwargs):
-        serializer = self.get_serializer(request.user.role)
-        permissions = serializer.data.get('permissions', [])
-        return response.Response({'permissions': permissions}, status=status.HTTP_200_OK)
+        role = request.user.role
+        parts = [str(role.pk), role.updated_at] if role else [None]
+        parts.append(permission_registry.catalog().digest)
+        return self.conditional_response(parts, lambda: response.Response(
+            {'permissions': expand_permissions(role.effective_permissions) if role else []},
+            status=status.HTTP_200_OK,
+        ))
+
+
+class SelfSessionListView(generics.ListAPIView):
+    serializer_class = serializers.AuthSessionSerializer
+
+    def get_queryset(self):
+        return AuthSession.objects.for_user(self.request.user.id).order_by('-created_at')
+
+    def delete(self, request, *args, **kwargs):
+        """Signs out every other session of the current user."""
+        revoked = revoke_user_sessions(request.user.id, keep_session=request.decoded_payload.get('session_key'))
+        return response.Response({'detail': f'{len(revoked)} session(s) revoked.'}, status=status.HTTP_200_OK)
+
+
+class SelfSessionDestroyView(generics.DestroyAPIView):
+    serializer_class = serializers.AuthSessionSerializer
+    lookup_field = 'session_key'
+
+    def get_queryset(self):
+        return AuthSession.objects.for_user(self.request.user.id)
+
+    def perform_destroy(self, instance):
+        delete_session(instance.session_key)
+        revocation_list.revoke_session(instance.session_key)
 
 
 ###################################################################### User Views ######################################################################
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalRequestMixin, viewsets.ModelViewSet):
     serializer_class = serializers.UserSerializer
-    queryset = User.objects.all()
+    queryset = User.objects.with_role()
+    validator_related = ('role',)
+    query_budget = {'GET': 4}  # principal, ETag aggregate, page, role parents (sessions come from the session cache)
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
 
     filterset_fields = ['is_active']
     search_fields = ['first_name', 'last_name', 'email']  
     ordering_fields = ['created_at', 'first_name', 'last_name', 'email']
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = self.get_serializer().prune_queryset(queryset)
+        return queryset
+
     def get_serializer_class(self):
         if self.request.method == 'UPDATE' or self.request.method == 'PATCH':   
             return serializers.UserUpdateSerializer
@@ -106,20 +172,101 @@ class UserViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         return response.Response({'detail': 'User creation is not allowed via this endpoint. Please use the invitation system.'}, status=status.HTTP_403_FORBIDDEN)
 
+    def perform_update(self, serializer):
+        was_active = serializer.instance.is_active
+        user = serializer.save()
+        if was_active and not user.is_active:
+            revoke_user_sessions(user.id)
+
     @transaction.atomic
     def perform_destroy(self, instance):
         models.Invitation.objects.filter(to_email=instance.email).delete()
         super().perform_destroy(instance)
            
     
+class UserSessionsView(generics.ListAPIView):
+    serializer_class = serializers.AuthSessionSerializer
+    permission_slugs = ("user.list", "user.delete")
+
+    def get_queryset(self):
+        return AuthSession.objects.for_user(self.kwargs.get('user_id')).order_by('-created_at')
+
+    def delete(self, request, *args, **kwargs):
+        """Signs out every session of the given user."""
+        revoked = revoke_user_sessions(self.kwargs.get('user_id'))
+        return response.Response({'detail': f'{len(revoked)} session(s) revoked.'}, status=status.HTTP_200_OK)
+           
+    
+class UserExportView(views.APIView):
+    """Streams every user as CSV (default) or NDJSON (`?file_format=ndjson`)."""
+    permission_slugs = ("user.export",)
+
+    def get(self, request, *args, **kwargs):
+        file_format = transfer.detect_format(None, request.query_params.get('file_format'))
+        rows = transfer.export_rows(User.objects.all(), file_format, chunk_size=settings.USER_IMPORT['EXPORT_CHUNK_SIZE'])
+        content_type = 'text/csv' if file_format == 'csv' else 'application/x-ndjson'
+        streaming = StreamingHttpResponse(rows, content_type=content_type)
+        streaming['Content-Disposition'] = f'attachment; filename="users.{file_format}"'
+        return streaming
+
+
+class UserImportView(views.APIView):
+    """
+    Creates users from an uploaded CSV or NDJSON `file` (email, first_name, last_name, is_active,
+    role_id or role). `update_existing` updates users whose email already exists, `invite` mails
+    the imported users a password-set link, `role` is the default role id or name.
+    The import runs inside the request, so uploads are capped at USER_IMPORT['HTTP_MAX_BYTES'] and
+    rows with a password are skipped; both go through `manage.py import_users` instead.
+    """
+    permission_slugs = ("user.import",)
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise SmoothException.error(detail="Upload a CSV or NDJSON file.", dev_message="User import without a file")
+
+        max_bytes = settings.USER_IMPORT['HTTP_MAX_BYTES']
+        if upload.size > max_bytes:
+            raise SmoothException.error(
+                detail=f"Files over {max_bytes // (1024 * 1024)} MB must be imported with `manage.py import_users`.",
+                dev_message=f"User import upload of {upload.size} bytes exceeds HTTP_MAX_BYTES ({max_bytes})",
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        file_format = transfer.detect_format(upload.name, request.data.get('file_format'))
+        importer = transfer.UserImporter(
+            update_existing=transfer.parse_flag(request.data.get('update_existing'), default=False),
+            invite=transfer.parse_flag(request.data.get('invite'), default=False),
+            default_role=request.data.get('role'),
+            allow_passwords=False,
+        )
+        summary = importer.run(transfer.read_rows(upload, file_format))
+        return response.Response(summary, status=status.HTTP_200_OK)
+
+
 ###################################################################### Invitations ######################################################################
 
 class InvitationListCreateView(generics.ListCreateAPIView):
     serializer_class = serializers.InvitationSerializer
     permission_slugs = ("invitations.list", "invitations.create")
     queryset = models.Invitation.objects.all()
+    query_budget = {'GET': 3}  # session + principal, page
     
     def get_queryset(self):
         queryset = super().get_queryset()
-        return queryset.exclude(from_email = None)
+        # The token is write-only, so lists never need to load it.
+        return queryset.exclude(from_email = None).defer('token')
+
+
+class InvitationBulkCreateView(generics.GenericAPIView):
+    """Invites a JSON list or an uploaded CSV of people in one request, with a result per row."""
+    serializer_class = serializers.InvitationBulkSerializer
+    permission_slugs = ("invitations.create", "user.invite")
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save()
+        return response.Response(result, status=status.HTTP_201_CREATED if result['invited'] else status.HTTP_200_OK)
         